@@ -0,0 +1,44 @@
+"""
+Minimal Django environment for the benchmarks, mirroring tests/conftest.py.
+
+Benchmarks are run from the repository root, e.g. `python -m benchmarks.token_size`.
+"""
+
+import sys
+from pathlib import Path
+
+import django
+from django.conf import settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup(**overrides) -> None:
+    """Configure Django with an in-memory database and create the tables."""
+    sys.path.insert(0, str(ROOT / "src"))
+
+    settings.configure(
+        **{
+            "DATABASES": {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+            "SECRET_KEY": "benchmark-signing-key-0123456789abcdef",
+            "INSTALLED_APPS": (
+                "django.contrib.auth",
+                "django.contrib.contenttypes",
+                "rest_framework",
+                "jwtauth",
+            ),
+            "USE_TZ": True,
+            **overrides,
+        }
+    )
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def create_user(username="john"):
+    from django.contrib.auth.models import User
+
+    return User.objects.create_user(username, f"{username}@example.com", "abc12345#")
@@ -0,0 +1,63 @@
+"""
+Encoding and decoding time of real tokens with each available JSON codec.
+
+    python -m benchmarks.json_codec
+"""
+
+import timeit
+from functools import partial
+
+from benchmarks.environment import create_user, setup
+
+NUMBER = 20000
+
+
+def main() -> None:
+    setup()
+
+    from django.contrib.auth.models import Group, Permission
+    from django.test import override_settings
+
+    from jwtauth.codec import get_jwt, orjson
+    from jwtauth.settings import api_settings
+    from jwtauth.tokens import AccessToken, RefreshToken
+
+    user = create_user()
+    group = Group.objects.create(name="editors")
+    group.permissions.set(Permission.objects.all()[:20])
+    user.groups.add(group)
+
+    with override_settings(JWTAUTH={"PERMISSIONS_CLAIM": True}):
+        claim_sets = {
+            "access": AccessToken(from_user=user).jwt_data,
+            "access+perms": AccessToken(from_user=user).jwt_data,
+            "refresh": RefreshToken(from_user=user).jwt_data,
+        }
+
+    with override_settings(JWTAUTH={"PERMISSIONS_CLAIM": False}):
+        claim_sets["access"] = AccessToken(from_user=user).jwt_data
+
+    codecs = ["json"] + (["orjson"] if orjson is not None else [])
+    key, algorithm = api_settings.SIGNING_KEY, api_settings.ALGORITHM
+
+    print(f"{'claims':<14} {'codec':<8} {'encode (us)':>12} {'decode (us)':>12}")
+
+    for name, claims in claim_sets.items():
+        for codec in codecs:
+            pyjwt = get_jwt(codec)
+            encoding = pyjwt.encode(claims, key, algorithm=algorithm)
+
+            encode = timeit.timeit(partial(pyjwt.encode, claims, key, algorithm=algorithm), number=NUMBER)
+            decode = timeit.timeit(
+                partial(pyjwt.decode, encoding, key, algorithms=[algorithm], options={"verify_exp": False}),
+                number=NUMBER,
+            )
+
+            print(f"{name:<14} {codec:<8} {encode / NUMBER * 1e6:>12.2f} {decode / NUMBER * 1e6:>12.2f}")
+
+    if orjson is None:
+        print("\norjson is not installed, only the standard library codec was measured.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+End-to-end load test of tests/sample_app, see __main__.py.
+
+    python -m benchmarks.loadtest --help
+"""
@@ -0,0 +1,312 @@
+"""
+End-to-end load test: tests/sample_app, serving the tests/test_views endpoints, is started under
+WSGI and ASGI with a growing number of worker processes, and driven by concurrent virtual users.
+
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --servers wsgi --workers 1 2 4 8 --users 64 --duration 20
+    python -m benchmarks.loadtest --database postgres  # local server, PG* environment variables
+
+Every virtual user logs in, then calls an authenticated endpoint, being silently refreshed whenever
+its short-lived access token (LOADTEST_ACCESS_LIFETIME seconds) expires, and logs out after
+--requests-per-session requests, before starting over. The report gives, for every server and
+number of workers, the throughput (and its scaling), the latency percentiles and the database
+queries per request of every kind of request.
+
+WSGI is served by gunicorn when installed (otherwise by the pre-forking server of
+benchmarks.loadtest.server), ASGI by uvicorn (skipped when not installed). Everything runs on the
+local machine, with SQLite by default.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from importlib.util import find_spec
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+HOST = "127.0.0.1"
+PASSWORD = "abc12345#"
+
+# kinds of requests
+LOGIN = "login"
+AUTHENTICATED = "authenticated"
+REFRESHED = "refreshed"  # authenticated, with a silent refresh
+LOGOUT = "logout"
+
+
+def environment(args, sqlite_path: str) -> dict:
+    python_path = [str(ROOT / "src"), str(ROOT / "tests" / "sample_app"), str(ROOT)]
+
+    return {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(python_path),
+        "DJANGO_SETTINGS_MODULE": "benchmarks.loadtest.settings",
+        "LOADTEST_DATABASE": args.database,
+        "LOADTEST_SQLITE_PATH": sqlite_path,
+        "LOADTEST_ACCESS_LIFETIME": str(args.access_lifetime),
+    }
+
+
+def prepare_database(env: dict, users: int) -> None:
+    """Create the tables and the users of the virtual users, in a fresh database."""
+    script = f"""
+import django
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+
+from jwtauth.models import ActiveToken, BlacklistedToken
+
+call_command("migrate", verbosity=0)
+
+if connection.vendor == "sqlite":
+    # readers do not wait for writers
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+ActiveToken.objects.all().delete()
+BlacklistedToken.objects.all().delete()
+User.objects.filter(username__startswith="loadtest").delete()
+
+password = make_password({PASSWORD!r})
+User.objects.bulk_create(User(username=f"loadtest{{i}}", password=password) for i in range({users}))
+"""
+    subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+
+def server_command(server: str, workers: int, port: int) -> list | None:
+    if server == "wsgi":
+        if find_spec("gunicorn"):
+            return [
+                *(sys.executable, "-m", "gunicorn", "benchmarks.loadtest.wsgi:application"),
+                *("--workers", str(workers), "--worker-class", "gthread", "--threads", "8"),
+                *("--bind", f"{HOST}:{port}", "--log-level", "warning"),
+            ]
+
+        return [sys.executable, "-m", "benchmarks.loadtest.server", "--workers", str(workers), "--port", str(port)]
+
+    if find_spec("uvicorn"):
+        return [
+            *(sys.executable, "-m", "uvicorn", "benchmarks.loadtest.asgi:application"),
+            *("--workers", str(workers), "--host", HOST, "--port", str(port)),
+            *("--log-level", "warning", "--no-access-log"),
+        ]
+
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port: int, process, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"The server exited with code {process.returncode}")
+
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+
+    raise Exception("The server did not start in time")
+
+
+class VirtualUser:
+    """A client keeping its cookies, like a browser would."""
+
+    def __init__(self, port: int, username: str):
+        self.port = port
+        self.username = username
+        self.cookies = {}
+        self.connection = http.client.HTTPConnection(HOST, port, timeout=30)
+
+    def request(self, method: str, path: str, body: dict = None):
+        headers = {"Cookie": "; ".join(f"{name}={value}" for name, value in self.cookies.items())}
+
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(body)
+
+        start = time.perf_counter()
+
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            response.read()
+
+        except (OSError, http.client.HTTPException):
+            # reconnect for the next request
+            self.connection.close()
+            return None, time.perf_counter() - start, 0, False
+
+        latency = time.perf_counter() - start
+        set_cookies = response.headers.get_all("Set-Cookie") or []
+
+        for header in set_cookies:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel.value and morsel["max-age"] != "0":
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+
+        return response.status, latency, int(response.headers.get("X-Queries", 0)), bool(set_cookies)
+
+    def session(self, requests: int, deadline: float, record) -> None:
+        status, latency, queries, _ = self.request("POST", "/login/", {"username": self.username, "password": PASSWORD})
+        record(LOGIN, status, latency, queries)
+
+        if status != 204:
+            return
+
+        for _ in range(requests):
+            if time.monotonic() >= deadline:
+                return
+
+            status, latency, queries, refreshed = self.request("GET", "/logged/")
+            record(REFRESHED if refreshed else AUTHENTICATED, status, latency, queries)
+
+        status, latency, queries, _ = self.request("DELETE", "/logout")
+        record(LOGOUT, status, latency, queries)
+
+
+def run_users(task) -> list:
+    """Run the given virtual users (in threads) until the deadline, returning the requests made."""
+    port, usernames, duration, requests_per_session = task
+    deadline = time.monotonic() + duration
+    records = []
+    lock = threading.Lock()
+
+    def record(kind, status, latency, queries):
+        with lock:
+            records.append((kind, status, latency, queries))
+
+    def loop(username):
+        user = VirtualUser(port, username)
+
+        while time.monotonic() < deadline:
+            user.session(requests_per_session, deadline, record)
+
+    threads = [threading.Thread(target=loop, args=(username,)) for username in usernames]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return records
+
+
+def drive(port: int, args) -> list:
+    """Drive the server with the virtual users, spread over client processes to avoid the GIL."""
+    usernames = [f"loadtest{i}" for i in range(args.users)]
+    processes = min(args.users, os.cpu_count() or 1)
+    tasks = [(port, usernames[i::processes], args.duration, args.requests_per_session) for i in range(processes)]
+
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        return [record for records in pool.map(run_users, tasks) for record in records]
+
+
+def percentile(values: list, p: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+
+    return statistics.quantiles(values, n=100)[p - 1]
+
+
+def report(server: str, workers: int, records: list, duration: float, baseline: float | None) -> float:
+    expected = {LOGIN: 204, AUTHENTICATED: 204, REFRESHED: 204, LOGOUT: 204}
+    errors = sum(1 for kind, status, _, _ in records if status != expected[kind])
+    latencies = sorted(latency * 1000 for _, _, latency, _ in records)
+    throughput = len(records) / duration
+
+    queries = defaultdict(list)
+
+    for kind, status, _, count in records:
+        if status == expected[kind]:
+            queries[kind].append(count)
+
+    scaling = f"x{throughput / baseline:.2f}" if baseline else "x1.00"
+    print(
+        f"{server:<5} {workers:>7} {len(records):>9} {throughput:>9.1f} {scaling:>7} "
+        f"{percentile(latencies, 50):>7.1f} {percentile(latencies, 90):>7.1f} {percentile(latencies, 99):>7.1f} "
+        f"{errors:>6}   "
+        + ", ".join(f"{kind} {statistics.mean(counts):.1f}" for kind, counts in sorted(queries.items()))
+    )
+
+    return throughput
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", choices=["wsgi", "asgi"], default=["wsgi", "asgi"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--requests-per-session", type=int, default=200)
+    parser.add_argument(
+        "--access-lifetime",
+        type=int,
+        default=2,
+        help="access token lifetime, in whole seconds (token lifetimes are truncated to seconds)",
+    )
+    parser.add_argument("--database", choices=["sqlite", "postgres"], default="sqlite")
+    args = parser.parse_args()
+
+    if args.access_lifetime < 1:
+        # a lifetime under a second expires the access tokens as soon as they are issued: every request
+        # would be a silent refresh, and the plain authenticated path would never be measured
+        parser.error("--access-lifetime must be at least 1 second")
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = environment(args, os.path.join(directory, "loadtest.sqlite3"))
+        prepare_database(env, args.users)
+
+        print("server workers  requests     req/s scaling     p50     p90     p99 errors   queries per request")
+
+        for server in args.servers:
+            baseline = None
+
+            for workers in args.workers:
+                port = free_port()
+                command = server_command(server, workers, port)
+
+                if command is None:
+                    print(f"{server:<5} skipped: uvicorn is not installed")
+                    break
+
+                process = subprocess.Popen(command, env=env, cwd=ROOT)
+
+                try:
+                    wait_until_ready(port, process)
+                    records = drive(port, args)
+                finally:
+                    process.terminate()
+                    process.wait()
+
+                throughput = report(server, workers, records, args.duration, baseline)
+                baseline = baseline or throughput
+
+
+if __name__ == "__main__":
+    main()
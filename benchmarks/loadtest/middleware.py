@@ -0,0 +1,24 @@
+from django.db import connection
+
+QUERIES_HEADER = "X-Queries"
+
+
+class QueryCountMiddleware:
+    """Report the number of database queries of every request in a response header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        response[QUERIES_HEADER] = str(count)
+        return response
@@ -0,0 +1,71 @@
+"""
+Minimal pre-forking WSGI server (standard library only), used when gunicorn is not installed:
+the listening socket is bound once, then shared by N forked worker processes, each serving
+requests with a thread per connection.
+
+    python -m benchmarks.loadtest.server --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import signal
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    from django.db import connections
+
+    from benchmarks.loadtest.wsgi import application
+
+    # children must not share the connections of the parent
+    connections.close_all()
+
+    server = ThreadingWSGIServer((host, port), QuietHandler)
+    server.set_app(application)
+
+    children = []
+
+    for _ in range(workers):
+        pid = os.fork()
+
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server.serve_forever()
+            os._exit(0)
+
+        children.append(pid)
+
+    def stop(signum, frame):
+        for child in children:
+            os.kill(child, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for child in children:
+        os.waitpid(child, 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
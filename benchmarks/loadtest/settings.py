@@ -0,0 +1,50 @@
+"""
+Settings of the load test: the sample app, serving the test views, with the database selected by
+the harness through environment variables.
+"""
+
+import os
+from datetime import timedelta
+
+from sample_app.settings import *  # noqa: F403
+from sample_app.settings import INSTALLED_APPS, JWTAUTH, MIDDLEWARE
+
+DEBUG = False
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+
+# test_app only checks the environment of the CI
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "test_app"]
+MIDDLEWARE = ["benchmarks.loadtest.middleware.QueryCountMiddleware", *MIDDLEWARE]
+ROOT_URLCONF = "benchmarks.loadtest.urls"
+
+# the load test measures jwtauth, not password hashing
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+JWTAUTH = {
+    **{key: value for key, value in JWTAUTH.items() if value is not None},
+    # short-lived access tokens, so that the virtual users are silently refreshed
+    "ACCESS_TOKEN_LIFETIME": timedelta(seconds=int(os.environ.get("LOADTEST_ACCESS_LIFETIME", "2"))),
+}
+
+if os.environ.get("LOADTEST_DATABASE") == "postgres":
+    # a local server, configured with the usual libpq environment variables
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("PGDATABASE", "jwtauth_loadtest"),
+            "USER": os.environ.get("PGUSER", ""),
+            "PASSWORD": os.environ.get("PGPASSWORD", ""),
+            "HOST": os.environ.get("PGHOST", "localhost"),
+            "PORT": os.environ.get("PGPORT", ""),
+            "CONN_MAX_AGE": 60,
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("LOADTEST_SQLITE_PATH", "loadtest.sqlite3"),
+            # writers wait for each other rather than failing with "database is locked"
+            "OPTIONS": {"timeout": 30},
+        }
+    }
@@ -0,0 +1,44 @@
+"""
+Refresh token validation: queries, query plan and time per validation.
+
+    python -m benchmarks.refresh_validation
+"""
+
+import timeit
+
+from benchmarks.environment import create_user, setup
+
+NUMBER = 2000
+
+
+def main() -> None:
+    setup()
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from jwtauth.tokens import RefreshToken
+    from jwtauth.users import UserModel
+
+    user = create_user()
+    token = RefreshToken(from_user=user)
+    token.save()
+
+    with CaptureQueriesContext(connection) as queries:
+        assert RefreshToken(from_encoding=token.encoding).valid()
+
+    print(f"queries per validation: {len(queries)}\n")
+
+    for query in queries:
+        print(query["sql"], "\n")
+
+    queryset = UserModel.objects.filter(pk=user.pk).annotate(**RefreshToken.session_annotations(token.token_string))
+    print("query plan:")
+    print(queryset.explain(), "\n")
+
+    elapsed = timeit.timeit(lambda: RefreshToken(from_encoding=token.encoding).valid(), number=NUMBER)
+    print(f"time per validation: {elapsed / NUMBER * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
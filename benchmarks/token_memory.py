@@ -0,0 +1,80 @@
+"""
+Memory and allocations of the per-request authentication objects (AuthManager and its tokens).
+
+    python -m benchmarks.token_memory
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.environment import create_user, setup
+
+NUMBER = 1000
+
+
+def deep_size(token) -> int:
+    """Size of a token object and of the containers it owns (not the user nor the encoding)."""
+    size = sys.getsizeof(token)
+
+    if hasattr(token, "__dict__"):
+        size += sys.getsizeof(token.__dict__)
+
+    if token.claims is not None:
+        size += sys.getsizeof(token.claims)
+
+    return size
+
+
+def main() -> None:
+    setup()
+
+    from django.test import RequestFactory
+
+    from jwtauth.manager import AuthManager
+    from jwtauth.settings import api_settings
+    from jwtauth.tokens import AccessToken, RefreshToken
+
+    user = create_user()
+    access = AccessToken(from_user=user)
+    refresh = RefreshToken(from_user=user)
+    refresh.save()
+
+    request = RequestFactory().get("/")
+    request.COOKIES[api_settings.ACCESS_TOKEN_COOKIE_NAME] = access.encoding
+    request.COOKIES[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+
+    print(f"access token object:  {deep_size(AccessToken(from_encoding=access.encoding)):>6} bytes")
+    print(f"refresh token object: {deep_size(RefreshToken(from_encoding=refresh.encoding)):>6} bytes")
+
+    # warm up caches (query compilation, codecs, ...)
+    AuthManager(request)
+
+    gc.collect()
+    gc.disable()
+    objects_before = len(gc.get_objects())
+
+    tracemalloc.start()
+    retained = [AuthManager(request) for _ in range(NUMBER)]
+    size, _ = tracemalloc.get_traced_memory()
+    objects = len(gc.get_objects()) - objects_before
+
+    del retained
+    gc.collect()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+
+    for _ in range(NUMBER):
+        AuthManager(request)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.enable()
+
+    print(f"retained per request: {size / NUMBER:>9.0f} bytes")
+    print(f"gc-tracked objects retained per request: {objects / NUMBER:.1f}")
+    print(f"peak allocation of a request: {peak - before:>9.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Size of the access and refresh cookies for each token profile.
+
+    python -m benchmarks.token_size
+"""
+
+from benchmarks.environment import create_user, setup
+
+
+def main() -> None:
+    setup()
+
+    from django.test import override_settings
+
+    from jwtauth.tokens import AccessToken, RefreshToken
+
+    user = create_user()
+
+    print(f"{'profile':<10} {'permissions':<12} {'access':>8} {'refresh':>8} {'total':>8}")
+
+    for profile in ("default", "compact"):
+        for permissions in (False, True):
+            with override_settings(JWTAUTH={"TOKEN_PROFILE": profile, "PERMISSIONS_CLAIM": permissions}):
+                access = len(AccessToken(from_user=user).encoding)
+                refresh = len(RefreshToken(from_user=user).encoding)
+
+            print(f"{profile:<10} {str(permissions):<12} {access:>8} {refresh:>8} {access + refresh:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,17 @@ class JwtAuthentication(authentication.BaseAuthentication):
 
         return None
 
+    def authenticate_header(self, request):
+        # imported here, the package must be importable without configured settings (e.g. by the
+        # worker processes of verify_many)
+        from jwtauth.settings import api_settings
+
+        # makes REST framework answer 401 Unauthorized (rather than 403) to unauthenticated requests
+        if api_settings.AUTH_HEADER_TYPES:
+            return f'{api_settings.AUTH_HEADER_TYPES[0]} realm="api"'
+
+        return None
+
 
 def login(request, user):
     """
@@ -1,6 +1,150 @@
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
+
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+
+from jwtauth.models import ActiveToken, BlacklistedToken, expiry_bucket
+from jwtauth.revocation import revoke_sessions, revoke_user_sessions
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator never running a full COUNT(*) of the token tables. Unfiltered changelists use the
+    planner estimate on PostgreSQL. Otherwise, only the rows up to the current page (and one more,
+    to know whether there is a next page) are counted: the pages after the next one are not shown.
+    """
+
+    def __init__(self, object_list, per_page, *args, page_number=1, **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.page_number = page_number
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            table = queryset.model._meta.db_table
+
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table])
+                row = cursor.fetchone()
+
+            # reltuples is -1 for tables never analyzed
+            if row and row[0] > 0:
+                return int(row[0])
+
+        start = (self.page_number - 1) * self.per_page
+        probed = len(queryset.values_list("pk", flat=True)[start : start + self.per_page + 1])
+
+        if start and not probed:
+            # past the last page: an empty page (with no rows, the changelist would not paginate)
+            return start + 1
+
+        return start + probed
+
+
+class ExpiryFilter(admin.SimpleListFilter):
+    title = "expiry"
+    parameter_name = "expiry"
+
+    # bucket -> (lower bound, upper bound) relative to now
+    buckets = {
+        "expired": (None, timedelta()),
+        "hour": (timedelta(), timedelta(hours=1)),
+        "day": (timedelta(hours=1), timedelta(days=1)),
+        "week": (timedelta(days=1), timedelta(weeks=1)),
+        "later": (timedelta(weeks=1), None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [
+            ("expired", "Expired"),
+            ("hour", "Within an hour"),
+            ("day", "Within a day"),
+            ("week", "Within a week"),
+            ("later", "Later"),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.buckets:
+            return queryset
+
+        now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+        lower, upper = self.buckets[self.value()]
+        lower = None if lower is None else now + int(lower.total_seconds())
+        upper = None if upper is None else now + int(upper.total_seconds())
+
+        if lower is not None:
+            queryset = queryset.filter(exp__gt=lower)
+
+        if upper is not None:
+            queryset = queryset.filter(exp__lte=upper)
+
+        if queryset.model is BlacklistedToken:
+            # exp is not indexed: the range is narrowed down with the (indexed) expiry buckets
+            if lower is not None:
+                queryset = queryset.filter(bucket__gte=expiry_bucket(lower))
+
+            if upper is not None:
+                queryset = queryset.filter(bucket__lte=expiry_bucket(upper))
+
+        return queryset
+
+
+class TokenAdmin(admin.ModelAdmin):
+    list_filter = (ExpiryFilter,)
+    paginator = EstimatedCountPaginator
+
+    # no "x results (y total)" full count
+    show_full_result_count = False
+
+    # counts are lower bounds: no "show all" link, which would list every matching row
+    list_max_show_all = 0
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page_number = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page_number = 1
+
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, page_number=page_number)
+
+
+@admin.register(BlacklistedToken)
+class BlacklistedTokenAdmin(TokenAdmin):
+    list_display = ("token_string", "exp")
+
+    # case-sensitive exact matches, served by the unique index ("=" would be case-insensitive)
+    search_fields = ("token_string__exact",)
+
+
+@admin.register(ActiveToken)
+class ActiveTokenAdmin(TokenAdmin):
+    list_display = ("token_string", "owner_sessions", "exp", "last_seen")
+    list_select_related = ("owner",)
+    raw_id_fields = ("owner",)
+
+    # owners are not searched: joined with the token string, neither index could be used. The
+    # sessions of a user are listed with ?owner__id__exact=<id>, served by the (owner, exp, id) index
+    search_fields = ("token_string__exact",)
+    actions = ("revoke_selected", "revoke_all_for_user")
+
+    @admin.display(description="owner", ordering="owner")
+    def owner_sessions(self, obj):
+        return format_html('<a href="?owner__id__exact={}">{}</a>', obj.owner_id, obj.owner)
 
-from jwtauth.models import ActiveToken, BlacklistedToken
+    @admin.action(description="Revoke selected sessions", permissions=["delete"])
+    def revoke_selected(self, request, queryset):
+        count = revoke_sessions(queryset)
+        self.message_user(request, f"Revoked {count} session(s).")
 
-admin.site.register(BlacklistedToken)
-admin.site.register(ActiveToken)
+    @admin.action(description="Revoke all sessions of the selected users", permissions=["delete"])
+    def revoke_all_for_user(self, request, queryset):
+        count = revoke_user_sessions(queryset.values_list("owner_id", flat=True))
+        self.message_user(request, f"Revoked {count} session(s).")
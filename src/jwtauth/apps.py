@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class JwtAuthConfig(AppConfig):
+    name = "jwtauth"
+    default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        from jwtauth.users import UserModel, invalidate_user
+
+        # keep the shared user cache consistent with the database
+        post_save.connect(invalidate_user, sender=UserModel, dispatch_uid="jwtauth_invalidate_user_save")
+        post_delete.connect(invalidate_user, sender=UserModel, dispatch_uid="jwtauth_invalidate_user_delete")
@@ -0,0 +1,101 @@
+import json
+import re
+from collections import OrderedDict
+from itertools import islice
+
+from jwt.utils import base64url_decode
+
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.verification import verify_many
+
+# token types of audit_tokens
+ACCESS = "access"
+REFRESH = "refresh"
+AUTO = "auto"  # told apart by their claims
+
+# jwtauth tokens: three base64url segments, the header being a JSON object ("eyJ" is '{"' encoded)
+TOKEN_PATTERN = re.compile(r"eyJ[A-Za-z0-9_-]*\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+")
+
+# number of unique tokens verified at once
+CHUNK_SIZE = 5000
+
+# number of most recent tokens remembered to skip duplicates
+DEDUPE_SIZE = 100000
+
+
+def extract_tokens(lines):
+    """The tokens found in the given lines (e.g. of an access log), in order."""
+    for line in lines:
+        yield from TOKEN_PATTERN.findall(line)
+
+
+def unique_tokens(tokens, size: int = DEDUPE_SIZE):
+    """
+    The given tokens without duplicates, as long as they are among the last `size` distinct tokens
+    seen: memory stays bounded, at the price of repeating tokens seen long before.
+    """
+    seen = OrderedDict()
+
+    for token in tokens:
+        if token in seen:
+            seen.move_to_end(token)
+            continue
+
+        seen[token] = None
+
+        if len(seen) > size:
+            seen.popitem(last=False)
+
+        yield token
+
+
+def token_class_of(encoding: str):
+    """
+    RefreshToken if the (unverified) claims of the token carry a token string, AccessToken
+    otherwise. Only used to pick the verification, which then checks the signature.
+    """
+    try:
+        claims = json.loads(base64url_decode(encoding.split(".")[1]))
+    except ValueError:
+        return AccessToken
+
+    if isinstance(claims, dict) and RefreshToken.lookup_claim(claims, RefreshToken.TOKEN_STRING_KEY) is not None:
+        return RefreshToken
+
+    return AccessToken
+
+
+def audit_tokens(
+    lines,
+    token_type: str = AUTO,
+    chunk_size: int = CHUNK_SIZE,
+    dedupe_size: int = DEDUPE_SIZE,
+    executor=None,
+    tenant=None,
+):
+    """
+    Classify the tokens found in the given lines, yielding a Verification (see verify_many) per
+    distinct token, in order of first appearance.
+
+    Lines are read lazily and tokens verified by chunks of `chunk_size`, each with a few queries (and
+    the signatures checked by the given executor, e.g. a ProcessPoolExecutor), so that memory stays
+    bounded whatever the size of the input.
+    """
+    classes = {ACCESS: AccessToken, REFRESH: RefreshToken}
+    tokens = unique_tokens(extract_tokens(lines), dedupe_size)
+
+    while chunk := list(islice(tokens, chunk_size)):
+        groups = {}
+
+        for token in chunk:
+            token_class = token_class_of(token) if token_type == AUTO else classes[token_type]
+            groups.setdefault(token_class, []).append(token)
+
+        results = {}
+
+        for token_class, group in groups.items():
+            for result in verify_many(group, token_class=token_class, executor=executor, tenant=tenant):
+                results[result.encoding] = result
+
+        for token in chunk:
+            yield results[token]
@@ -0,0 +1,24 @@
+from django.contrib.auth.backends import ModelBackend
+
+from jwtauth.permissions import snapshot_permissions
+
+
+class TokenPermissionBackend(ModelBackend):
+    """
+    Permission backend answering from the permission snapshot embedded in the access token
+    (see the PERMISSIONS_CLAIM setting), without querying the database. Users without a
+    snapshot, and object permissions, are handled as in ModelBackend.
+
+    Meant to replace ModelBackend in AUTHENTICATION_BACKENDS.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if obj is not None:
+            return super().get_all_permissions(user_obj, obj)
+
+        permissions = snapshot_permissions(user_obj)
+
+        if permissions is None:
+            return super().get_all_permissions(user_obj, obj)
+
+        return permissions
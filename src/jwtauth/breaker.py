@@ -0,0 +1,258 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import DatabaseError
+from django.db.models import Model
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from jwtauth.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# operations that DEGRADED_FAIL_CLOSED may refuse while the database is unavailable
+LOGIN = "login"
+REFRESH = "refresh"
+
+
+class DatabaseUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Authentication is temporarily unavailable."
+    default_code = "database_unavailable"
+
+
+class ModelSnapshot:
+    """The loaded field values of a model instance, from which a new instance can be built."""
+
+    __slots__ = ("model", "db", "field_names", "values")
+
+    def __init__(self, instance):
+        self.model = type(instance)
+        self.db = instance._state.db
+
+        # deferred fields (e.g. USER_QUERY_ONLY) are not in the instance dict, nor is any cache
+        self.field_names = [
+            field.attname for field in instance._meta.concrete_fields if field.attname in instance.__dict__
+        ]
+        self.values = [instance.__dict__[name] for name in self.field_names]
+
+    def restore(self):
+        return self.model.from_db(self.db, self.field_names, copy.deepcopy(self.values))
+
+
+def snapshot(value):
+    """A cheap copy of a lookup result (e.g. a user, or a user and its annotations)."""
+    if isinstance(value, Model):
+        return ModelSnapshot(value)
+
+    if isinstance(value, tuple):
+        return tuple(snapshot(item) for item in value)
+
+    if isinstance(value, dict):
+        return dict(value)
+
+    return value
+
+
+def restore(value):
+    """The lookup result of the given snapshot, with new model instances."""
+    if isinstance(value, ModelSnapshot):
+        return value.restore()
+
+    if isinstance(value, tuple):
+        return tuple(restore(item) for item in value)
+
+    if isinstance(value, dict):
+        return dict(value)
+
+    return value
+
+
+class LastKnownState:
+    """
+    Bounded store (least recently used entries are dropped first) of the last values read from the
+    database, served in place of the database while the circuit breaker is open, as long as they
+    are not older than DEGRADED_STALENESS.
+
+    Every lookup is stored while the database is healthy, thus only snapshots of the field values of
+    model instances are kept. New instances are built when served: requests modify the users they
+    are given (permission caches, snapshots), and fresh instances keep them from sharing that state.
+    Related objects and prefetched relations are not kept.
+    """
+
+    MISSING = object()
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (snapshot, monotonic time of the read)
+
+    def set(self, key, value) -> None:
+        value = snapshot(value)
+
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > api_settings.DEGRADED_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self.lock:
+            value, read_at = self.entries.get(key, (self.MISSING, None))
+
+        if value is self.MISSING or time.monotonic() - read_at > api_settings.DEGRADED_STALENESS.total_seconds():
+            return default
+
+        return restore(value)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker around the database lookups of jwtauth (users and session state).
+
+    Lookups failing with a DatabaseError, or taking longer than DB_QUERY_TIMEOUT, are failures.
+    After DB_BREAKER_FAILURE_THRESHOLD consecutive failures the breaker opens: lookups do not hit
+    the database anymore and are answered from the last known state instead. After
+    DB_BREAKER_RESET_TIMEOUT a single lookup is let through (half-open state), closing the breaker
+    if it succeeds and opening it again otherwise.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_known = LastKnownState()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.trips = 0
+            self.degraded_seconds = 0.0  # time spent open or half-open, excluding the current period
+            self.degraded_calls = 0  # lookups answered from the last known state
+
+        self.last_known.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return api_settings.DB_BREAKER
+
+    @property
+    def degraded(self) -> bool:
+        return self.enabled and self.state != CLOSED
+
+    def fails_closed(self, operation: str) -> bool:
+        """Whether the given operation (LOGIN or REFRESH) must be refused right now."""
+        return self.degraded and operation in api_settings.DEGRADED_FAIL_CLOSED
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+
+            reset_timeout = api_settings.DB_BREAKER_RESET_TIMEOUT.total_seconds()
+
+            if self.state == OPEN and time.monotonic() - self.opened_at >= reset_timeout:
+                # let a single trial lookup through
+                self.state = HALF_OPEN
+                return True
+
+            return False
+
+    def trip(self) -> None:
+        with self.lock:
+            self._open()
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+
+            if self.state != CLOSED:
+                self.degraded_seconds += time.monotonic() - self.opened_at
+                self.state = CLOSED
+                self.opened_at = None
+                logger.warning("jwtauth: database available again, leaving degraded mode")
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+
+            if self.state == HALF_OPEN or self.failures >= api_settings.DB_BREAKER_FAILURE_THRESHOLD:
+                self._open()
+
+    def _open(self) -> None:
+        if self.state == CLOSED:
+            self.trips += 1
+            self.opened_at = time.monotonic()
+            logger.warning("jwtauth: database unavailable, entering degraded mode")
+
+        elif self.state == HALF_OPEN:
+            # the failed trial starts a new reset timeout, the degraded period goes on
+            self.degraded_seconds += time.monotonic() - self.opened_at
+            self.opened_at = time.monotonic()
+
+        self.state = OPEN
+
+    def call(self, key, func, default=None):
+        """
+        Returns func() (a database lookup), remembering the result under the given key, or the last
+        known result for the key (default if none, or if too old) when the database is unavailable.
+        """
+        if not self.enabled:
+            return func()
+
+        if not self.allow():
+            return self.fallback(key, default)
+
+        start = time.monotonic()
+
+        try:
+            result = func()
+
+        except DatabaseError:
+            logger.exception("jwtauth: database lookup failed")
+            self.record_failure()
+            return self.fallback(key, default)
+
+        if time.monotonic() - start > api_settings.DB_QUERY_TIMEOUT.total_seconds():
+            # the result is still good, but the database is struggling
+            self.record_failure()
+        else:
+            self.record_success()
+
+        self.last_known.set(key, result)
+        return result
+
+    def fallback(self, key, default):
+        with self.lock:
+            self.degraded_calls += 1
+
+        return self.last_known.get(key, default)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            degraded_seconds = self.degraded_seconds
+
+            if self.state != CLOSED:
+                degraded_seconds += time.monotonic() - self.opened_at
+
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "degraded_seconds": degraded_seconds,
+                "degraded_calls": self.degraded_calls,
+            }
+
+
+db_breaker = CircuitBreaker()
@@ -0,0 +1,90 @@
+import json
+from functools import lru_cache
+
+import jwt
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class JSONCodec:
+    """The standard library codec, producing exactly the same bytes as PyJWT."""
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """
+    A codec based on orjson (pip install orjson), several times faster than the standard library.
+
+    Its output only differs from JSONCodec for non-ASCII strings, which are written as UTF-8
+    rather than escaped. Both codecs read each other's output.
+    """
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+class CodecJWT(jwt.PyJWT):
+    """
+    PyJWT using the given codec for the payload. Signature and claim verification are left to
+    PyJWT; the header is tiny and keeps going through the standard library.
+    """
+
+    def __init__(self, codec, options=None):
+        super().__init__(options)
+        self.codec = codec
+
+    def _encode_payload(self, payload, headers=None, json_encoder=None) -> bytes:
+        return self.codec.dumps(payload)
+
+    def _decode_payload(self, decoded):
+        try:
+            payload = self.codec.loads(decoded["payload"])
+        except (ValueError, RecursionError) as e:
+            raise jwt.DecodeError(f"Invalid payload string: {e}") from e
+
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+
+        return payload
+
+
+def get_codec(name: str):
+    """
+    Returns the codec for the JSON_CODEC setting: "json", "orjson", "auto" (orjson when
+    installed, the standard library otherwise) or the dotted path of an object providing
+    dumps (returning bytes) and loads.
+    """
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+
+    if name == "json":
+        return JSONCodec
+
+    if name == "orjson":
+        if orjson is None:
+            raise Exception("The orjson codec requires the orjson package.")
+
+        return OrjsonCodec
+
+    return import_string(name)
+
+
+@lru_cache
+def get_jwt(name: str) -> CodecJWT:
+    return CodecJWT(get_codec(name))
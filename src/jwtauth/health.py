@@ -0,0 +1,146 @@
+from calendar import timegm
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.db.models import Avg, Count, Max, Q
+
+from jwtauth.models import ActiveToken, BlacklistedToken
+from jwtauth.sessions import PAGE_SIZE
+from jwtauth.settings import api_settings
+from jwtauth.tokens import RefreshToken
+
+# users with more sessions are flagged, unless MAX_SESSIONS_PER_USER is set
+ABNORMAL_SESSIONS = 20
+
+# share of the table pages sampled to estimate the share of expired rows (PostgreSQL only)
+SAMPLE_PERCENT = 1
+
+# plan fragments of index-only scans: PostgreSQL, SQLite and MySQL
+INDEX_ONLY_MARKERS = ("Index Only Scan", "COVERING INDEX", "Using index")
+
+# the single-table lookups whose plans are checked for index-only scans
+LOOKUPS = ("active_lookup", "blacklist_lookup")
+
+
+def token_health(exact: bool = False, threshold: int = None, top: int = 10, plans: bool = True) -> dict:
+    """
+    Statistics of the token tables: rows and share of expired rows of each, sessions per user (with
+    the users having more than `threshold` sessions, at most `top` of them), index sizes (PostgreSQL
+    only, None elsewhere) and the query plans of the hot queries of jwtauth, telling for the token
+    string lookups whether they are index-only.
+
+    On PostgreSQL, unless `exact` is set, row counts are planner estimates and the share of expired
+    rows is measured on a sample of the table, so that the tables are not scanned.
+    """
+    now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+
+    if threshold is None:
+        threshold = api_settings.MAX_SESSIONS_PER_USER or ABNORMAL_SESSIONS
+
+    blacklisted = table_stats(BlacklistedToken, now, exact)
+
+    # served by the bucket index
+    blacklisted["retirable"] = BlacklistedToken.objects.filter(bucket__lte=now).count()
+
+    return {
+        "active_tokens": table_stats(ActiveToken, now, exact),
+        "blacklisted_tokens": blacklisted,
+        "sessions_per_user": session_stats(threshold, top),
+        "index_sizes": index_sizes(),
+        "plans": {name: explain(name, queryset) for name, queryset in hot_queries(now).items()} if plans else None,
+    }
+
+
+def table_stats(model, now: int, exact: bool) -> dict:
+    connection = connections[router.db_for_read(model)]
+
+    if not exact and connection.vendor == "postgresql":
+        table = connection.ops.quote_name(model._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+
+            cursor.execute(
+                f"SELECT count(*), count(*) FILTER (WHERE exp <= %s) FROM {table} TABLESAMPLE SYSTEM (%s)",
+                [now, SAMPLE_PERCENT],
+            )
+            sampled, expired = cursor.fetchone()
+
+        # reltuples is -1 for tables never analyzed
+        if row and row[0] > 0:
+            rows = int(row[0])
+            share = expired / sampled if sampled else 0.0
+            return {"rows": rows, "expired": int(rows * share), "expired_share": share, "estimated": True}
+
+    counts = model.objects.aggregate(rows=Count("pk"), expired=Count("pk", filter=Q(exp__lte=now)))
+    share = counts["expired"] / counts["rows"] if counts["rows"] else 0.0
+    return {**counts, "expired_share": share, "estimated": False}
+
+
+def session_stats(threshold: int, top: int) -> dict:
+    # served by the (owner, exp, id) index
+    per_user = ActiveToken.objects.values("owner_id").annotate(sessions=Count("pk")).order_by()
+    stats = per_user.aggregate(users=Count("owner_id"), max=Max("sessions"), mean=Avg("sessions"))
+
+    abnormal = per_user.filter(sessions__gt=threshold).order_by("-sessions", "owner_id")[:top]
+
+    return {
+        "users": stats["users"],
+        "max": stats["max"] or 0,
+        "mean": stats["mean"] or 0.0,
+        "threshold": threshold,
+        "abnormal": [{"user_id": row["owner_id"], "sessions": row["sessions"]} for row in abnormal],
+    }
+
+
+def index_sizes() -> dict | None:
+    """Size in bytes of each table and index of jwtauth, PostgreSQL only."""
+    connection = connections[router.db_for_read(ActiveToken)]
+
+    if connection.vendor != "postgresql":
+        return None
+
+    tables = [ActiveToken._meta.db_table, BlacklistedToken._meta.db_table]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT t.relname, pg_relation_size(t.oid), i.relname, pg_relation_size(i.oid)
+            FROM pg_class t
+            JOIN pg_index x ON x.indrelid = t.oid
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE t.relname = ANY(%s)
+            """,
+            [tables],
+        )
+
+        sizes = {}
+
+        for table, table_size, index, index_size in cursor.fetchall():
+            sizes.setdefault(table, {"table": table_size, "indexes": {}})["indexes"][index] = index_size
+
+    return sizes
+
+
+def hot_queries(now: int) -> dict:
+    """The queries of jwtauth run by (almost) every request, or by the periodic jobs."""
+    token_string = "x" * 30
+    annotations = RefreshToken.session_annotations(token_string)
+    users = get_user_model()._default_manager
+
+    return {
+        # user, session and blacklist of every request with a refresh token
+        "refresh_validation": users.filter(pk=0).annotate(**annotations).values(*annotations),
+        "active_lookup": ActiveToken.objects.filter(token_string=token_string).values_list("token_string"),
+        "blacklist_lookup": BlacklistedToken.objects.filter(token_string=token_string).values_list("token_string"),
+        "session_listing": ActiveToken.objects.filter(owner_id=0, exp__gt=now).order_by("-exp", "-id")[:PAGE_SIZE],
+        "bucket_retirement": BlacklistedToken.objects.filter(bucket__lte=now).values_list("pk"),
+    }
+
+
+def explain(name: str, queryset) -> dict:
+    plan = queryset.explain()
+    index_only = any(marker in plan for marker in INDEX_ONLY_MARKERS) if name in LOOKUPS else None
+    return {"plan": plan, "index_only": index_only}
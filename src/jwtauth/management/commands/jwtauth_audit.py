@@ -0,0 +1,78 @@
+import json
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand
+
+from jwtauth.audit import ACCESS, AUTO, CHUNK_SIZE, DEDUPE_SIZE, REFRESH, audit_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Classify the jwtauth tokens found in a file (e.g. an access log) as valid, expired, invalid "
+        "(malformed or forged), revoked or unknown_user, one line per distinct token."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="File to read the tokens from, - for the standard input.")
+        parser.add_argument("--output", help="File to write the results to, the standard output by default.")
+        parser.add_argument("--format", choices=["tsv", "jsonl"], default="tsv")
+        parser.add_argument("--token-type", choices=[AUTO, ACCESS, REFRESH], default=AUTO)
+        parser.add_argument("--tenant", help="Tenant the tokens were issued for (see TENANTS).")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Tokens verified at once.")
+        parser.add_argument("--dedupe-size", type=int, default=DEDUPE_SIZE, help="Recent tokens remembered.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Processes checking the signatures, 0 to check them in this process.",
+        )
+
+    def handle(self, *args, **options):
+        counts = Counter()
+
+        with ExitStack() as stack:
+            if options["input"] == "-":
+                lines = sys.stdin
+            else:
+                lines = stack.enter_context(open(options["input"], encoding="utf-8", errors="replace"))
+
+            output = self.stdout
+            if options["output"]:
+                output = stack.enter_context(open(options["output"], "w", encoding="utf-8"))
+
+            executor = None
+            if options["workers"]:
+                # the workers only check signatures, they do not need Django: no need to fork this process
+                context = multiprocessing.get_context("spawn")
+                executor = stack.enter_context(ProcessPoolExecutor(options["workers"], mp_context=context))
+
+            results = audit_tokens(
+                lines,
+                token_type=options["token_type"],
+                chunk_size=options["chunk_size"],
+                dedupe_size=options["dedupe_size"],
+                executor=executor,
+                tenant=options["tenant"],
+            )
+
+            for result in results:
+                counts[result.status] += 1
+                output.write(format_result(result, options["format"]) + "\n")
+
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        self.stderr.write(f"Audited {sum(counts.values())} tokens: {summary or 'none found'}")
+
+
+def format_result(result, output_format: str) -> str:
+    user_id = result.user.pk if result.user is not None else None
+
+    if output_format == "jsonl":
+        return json.dumps({"status": result.status, "user_id": user_id, "exp": result.exp, "token": result.encoding})
+
+    values = (result.status, user_id, result.exp, result.encoding)
+    return "\t".join("" if value is None else str(value) for value in values)
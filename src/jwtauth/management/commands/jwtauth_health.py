@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from jwtauth.health import token_health
+
+
+class Command(BaseCommand):
+    help = "Report the state of the token tables: rows, expired rows, sessions per user, index sizes and query plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exact", action="store_true", help="Count rows exactly, even on PostgreSQL.")
+        parser.add_argument("--threshold", type=int, help="Flag the users with more sessions than this.")
+        parser.add_argument("--top", type=int, default=10, help="Number of flagged users listed.")
+        parser.add_argument("--no-plans", action="store_true", help="Do not explain the hot queries.")
+        parser.add_argument("--json", action="store_true", dest="as_json", help="Print the report as JSON.")
+
+    def handle(self, *args, exact=False, threshold=None, top=10, no_plans=False, as_json=False, **options):
+        report = token_health(exact=exact, threshold=threshold, top=top, plans=not no_plans)
+
+        if as_json:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for name in ("active_tokens", "blacklisted_tokens"):
+            stats = report[name]
+            estimated = " (estimated)" if stats["estimated"] else ""
+            self.stdout.write(
+                f"{name}: {stats['rows']} rows{estimated}, {stats['expired']} expired ({stats['expired_share']:.1%})"
+            )
+
+        self.stdout.write(f"blacklisted_tokens: {report['blacklisted_tokens']['retirable']} in ended buckets")
+
+        sessions = report["sessions_per_user"]
+        self.stdout.write(
+            f"sessions per user: {sessions['users']} users, max {sessions['max']}, mean {sessions['mean']:.1f}"
+        )
+
+        for user in sessions["abnormal"]:
+            self.stdout.write(
+                self.style.WARNING(f"  user {user['user_id']}: {user['sessions']} sessions (> {sessions['threshold']})")
+            )
+
+        for table, sizes in (report["index_sizes"] or {}).items():
+            self.stdout.write(f"{table}: {sizes['table']} bytes")
+
+            for index, size in sizes["indexes"].items():
+                self.stdout.write(f"  {index}: {size} bytes")
+
+        for name, plan in (report["plans"] or {}).items():
+            index_only = "" if plan["index_only"] is None else f" (index-only: {'yes' if plan['index_only'] else 'no'})"
+            self.stdout.write(f"{name}{index_only}:")
+
+            for line in plan["plan"].splitlines():
+                self.stdout.write(f"  {line}")
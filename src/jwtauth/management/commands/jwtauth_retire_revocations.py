@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from jwtauth.revocation import retire_expired_buckets
+
+
+class Command(BaseCommand):
+    help = "Delete the revoked tokens of the expiry buckets that have ended (see REVOCATION_BUCKET_SIZE)."
+
+    def handle(self, *args, **options):
+        count = retire_expired_buckets()
+        self.stdout.write(f"Retired {count} expired revocations")
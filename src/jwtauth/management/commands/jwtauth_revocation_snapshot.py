@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from jwtauth.revocation_snapshot import write_revocation_snapshot
+from jwtauth.settings import api_settings
+
+
+class Command(BaseCommand):
+    help = "Write the snapshot of the revoked tokens shared by the workers of this host (REVOCATION_SNAPSHOT_PATH)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Snapshot file, REVOCATION_SNAPSHOT_PATH by default.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running, writing the snapshot every INTERVAL seconds.",
+        )
+
+    def handle(self, *args, path=None, interval=None, **options):
+        path = path or api_settings.REVOCATION_SNAPSHOT_PATH
+
+        if path is None:
+            raise CommandError("Please set REVOCATION_SNAPSHOT_PATH or pass --path.")
+
+        while True:
+            count, watermark = write_revocation_snapshot(path)
+            self.stdout.write(f"Wrote {count} revoked tokens up to #{watermark} to {path}")
+
+            if interval is None:
+                return
+
+            # do not hold a connection between runs
+            connections.close_all()
+            time.sleep(interval)
@@ -1,27 +1,69 @@
+from calendar import timegm
+from datetime import datetime, timezone
+
 from django.conf import settings
 
+from jwtauth.breaker import LOGIN, REFRESH, DatabaseUnavailable, db_breaker
 from jwtauth.settings import api_settings
+from jwtauth.tenants import resolve_tenant
 from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.writer import session_writer
 
 ACCESS_TOKEN_KEY = api_settings.ACCESS_TOKEN_COOKIE_NAME
 REFRESH_TOKEN_KEY = api_settings.REFRESH_TOKEN_COOKIE_NAME
 
 
 class AuthManager:
-    def __init__(self, request):
-        self.access_token = get_access_token(request)
-        self.refresh_token = get_refresh_token(request)
+    def __init__(self, request, rotate: bool = True):
+        """
+        :param rotate: Whether the refresh token may be rotated on silent refresh (see
+            ROTATE_REFRESH_TOKENS). Callers that cannot set cookies (e.g. a WebSocket handshake)
+            must disable it, or the client would keep an outdated generation.
+        """
+        self.users = {}
+        self.access_token = None
+        self.refresh_token = None
+        self.bearer = False
         self.silent_refresh = False
+        self.rotated = False
         self.is_authenticated = False
         self.logging_in = False
         self.logging_out = False
         self.user = None
 
+        # tokens are signed and verified with the configuration of the tenant of the request
+        self.tenant = resolve_tenant(request)
+
+        bearer_token = get_bearer_token(request, self.users, self.tenant)
+
+        if bearer_token is not None:
+            # stateless authentication through the Authorization header: no refresh token,
+            # no blacklist and no cookies
+            self.bearer = True
+            self.access_token = bearer_token
+
+            if bearer_token.valid() and not bearer_token.expired():
+                self.user = bearer_token.user
+                self.is_authenticated = True
+
+            return
+
+        # both tokens carry the same user, which is loaded once: the refresh token is decoded
+        # first, as it loads the user and its session state in a single query
+        self.refresh_token = get_refresh_token(request, self.users, self.tenant)
+        self.access_token = get_access_token(request, self.users, self.tenant)
+
         if not self.access_token or not self.refresh_token:
             # in order to be authenticated, the user must provide both the
             # authentication token (even if expired) and a valid refresh token
             return
 
+        if self.refresh_token.session_alive() and self.refresh_token.reused():
+            # an old generation of a rotated refresh token: it may have been stolen, the whole
+            # session is revoked
+            self.refresh_token.revoke_family()
+            return
+
         if not self.access_token.valid() or not self.refresh_token.valid():
             # we end up here if:
             # - one of the tokens was forged by a malicious user
@@ -33,14 +75,54 @@ class AuthManager:
                 # both tokens are expired, the user has to log in again
                 return
 
+            if db_breaker.fails_closed(REFRESH):
+                # the session state might be stale, no new access tokens until the database is back
+                return
+
             # we silently refresh the authentication token and let the user in
             self.silent_refresh = True
             self.access_token = self.refresh_token.gen_access_token()
 
+            if rotate and api_settings.ROTATE_REFRESH_TOKENS and not db_breaker.degraded:
+                rotated = self.refresh_token.rotate()
+
+                # not rotated if a concurrent request did it first, its response carries the new token
+                if rotated is not None:
+                    self.refresh_token = rotated
+                    self.rotated = True
+
         # the authentication token is valid and not expired
         self.user = self.access_token.user
         self.is_authenticated = True
 
+        # last seen timestamps are not written while the database is unavailable
+        if api_settings.TRACK_LAST_SEEN and not db_breaker.degraded:
+            now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+            session_writer.touch(self.refresh_token.token_string, now)
+
+    def revalidate(self) -> bool:
+        """
+        Check again whether the session is still alive (refresh token neither expired nor revoked),
+        for long-lived connections authenticated once. Returns whether the user is still authenticated.
+        Bearer sessions have no refresh token: they end when the access token expires.
+        """
+        if not self.is_authenticated:
+            return False
+
+        if self.bearer:
+            alive = not self.access_token.expired()
+        else:
+            token = RefreshToken(from_encoding=self.refresh_token.encoding, tenant=self.tenant)
+
+            # the token may have been rotated by other requests of the client in the meantime
+            alive = token.session_alive() and not token.expired()
+
+        if not alive:
+            self.is_authenticated = False
+            self.user = None
+
+        return self.is_authenticated
+
     def login(self, user) -> None:
         if not user:
             raise Exception("Please provide a valid user")
@@ -48,9 +130,12 @@ class AuthManager:
         if self.is_authenticated:  # already logged in
             raise Exception("User is already logged in")
 
-        self.access_token = AccessToken(from_user=user)
+        if db_breaker.fails_closed(LOGIN):
+            raise DatabaseUnavailable()
 
-        self.refresh_token = RefreshToken(from_user=user)
+        self.access_token = AccessToken(from_user=user, tenant=self.tenant)
+
+        self.refresh_token = RefreshToken(from_user=user, tenant=self.tenant)
         self.refresh_token.save()
 
         self.logging_in = True
@@ -61,28 +146,51 @@ class AuthManager:
         self.logging_out = True
 
     def apply(self, response) -> None:
+        if self.bearer:
+            # header-based clients do not use cookies
+            return
+
         if self.silent_refresh:
-            # we refresh and update the authentication token only
-            set_access_token(response, self.refresh_token.gen_access_token())
+            # the authentication token minted when the request came in
+            set_access_token(response, self.access_token)
+
+        if self.rotated:
+            set_refresh_token(response, self.refresh_token)
 
         if self.logging_in:
             set_access_token(response, self.access_token)
             set_refresh_token(response, self.refresh_token)
 
         if self.logging_out:
-            if self.refresh_token and self.refresh_token.valid() and not self.refresh_token.expired():
-                # blacklist the token if valid and still alive
+            # blacklist the token if valid and still alive. While the database is unavailable, the
+            # cookies are deleted all the same, and the session ends when its refresh token expires
+            alive = self.refresh_token and self.refresh_token.valid() and not self.refresh_token.expired()
+
+            if alive and not db_breaker.degraded:
                 self.refresh_token.blacklist()
 
             delete_access_token(response)
             delete_refresh_token(response)
 
 
-def get_token(request, key, token_class):
+def get_token(request, key, token_class, users=None, tenant=None):
     if key not in request.COOKIES:
         return None
 
-    return token_class(from_encoding=request.COOKIES[key])
+    return token_class(from_encoding=request.COOKIES[key], users=users, tenant=tenant)
+
+
+def get_bearer_token(request, users=None, tenant=None):
+    """
+    Returns the access token of the Authorization header (e.g. "Bearer <token>"), or None if the
+    header is missing, malformed or of a type not listed in AUTH_HEADER_TYPES.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "").split()
+
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+
+    return AccessToken(from_encoding=header[1], users=users, tenant=tenant)
 
 
 def set_token(response, key, token):
@@ -90,12 +198,12 @@ def set_token(response, key, token):
     response.set_cookie(key, token.encoding, httponly=True, samesite="Strict", secure=secure)
 
 
-def get_access_token(request):
-    return get_token(request, ACCESS_TOKEN_KEY, AccessToken)
+def get_access_token(request, users=None, tenant=None):
+    return get_token(request, ACCESS_TOKEN_KEY, AccessToken, users, tenant)
 
 
-def get_refresh_token(request):
-    return get_token(request, REFRESH_TOKEN_KEY, RefreshToken)
+def get_refresh_token(request, users=None, tenant=None):
+    return get_token(request, REFRESH_TOKEN_KEY, RefreshToken, users, tenant)
 
 
 def set_access_token(response, token):
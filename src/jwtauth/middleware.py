@@ -1,8 +1,28 @@
+from functools import partial
+
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject
+
 from jwtauth.manager import AuthManager
 
 
+def get_user(request):
+    manager = request.jwtauth
+    return manager.user if manager.is_authenticated else AnonymousUser()
+
+
+async def aget_user(request):
+    # the tokens have been checked already, no database access
+    return get_user(request)
+
+
 class AuthenticationMiddleware:
-    """jwtauth authentication middleware. Required for the package to work."""
+    """
+    jwtauth authentication middleware. Required for the package to work.
+
+    Besides request.jwtauth, it sets request.user (and request.auser) lazily from the tokens, so
+    that plain Django views and templates do not need Django's session and auth middleware.
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
@@ -10,6 +30,8 @@ class AuthenticationMiddleware:
     def __call__(self, request):
         # set the manager as an attribute of the request
         request.jwtauth = AuthManager(request)
+        request.user = SimpleLazyObject(partial(get_user, request))
+        request.auser = partial(aget_user, request)
 
         # process the request
         response = self.get_response(request)
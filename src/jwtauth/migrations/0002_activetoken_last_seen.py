@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jwtauth", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activetoken",
+            name="last_seen",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jwtauth", "0002_activetoken_last_seen"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activetoken",
+            index=models.Index(fields=["owner", "exp", "id"], name="jwtauth_active_owner_exp"),
+        ),
+    ]
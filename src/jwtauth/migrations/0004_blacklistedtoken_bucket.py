@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_buckets(apps, schema_editor):
+    from jwtauth.settings import api_settings
+
+    BlacklistedToken = apps.get_model("jwtauth", "BlacklistedToken")
+    size = int(api_settings.REVOCATION_BUCKET_SIZE.total_seconds())
+
+    # a single UPDATE, same formula as jwtauth.models.expiry_bucket
+    BlacklistedToken.objects.update(bucket=F("exp") - F("exp") % size + size)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jwtauth", "0003_activetoken_owner_exp_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blacklistedtoken",
+            name="bucket",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+        # indexed once filled
+        migrations.AlterField(
+            model_name="blacklistedtoken",
+            name="bucket",
+            field=models.IntegerField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jwtauth", "0004_blacklistedtoken_bucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activetoken",
+            name="generation",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="activetoken",
+            name="rotated_at",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
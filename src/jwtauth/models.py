@@ -1,13 +1,41 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from jwtauth.settings import api_settings
+
+
+def expiry_bucket(exp: int) -> int:
+    """
+    The bucket of a token expiring at exp: the end (in seconds since epoch) of its window of
+    REVOCATION_BUCKET_SIZE. All the tokens of a bucket are expired once its end has passed.
+    """
+    size = int(api_settings.REVOCATION_BUCKET_SIZE.total_seconds())
+    return exp - exp % size + size
+
 
 class BlacklistedToken(models.Model):
     token_string = models.CharField(max_length=30, unique=True)
     exp = models.IntegerField()
+    bucket = models.IntegerField(db_index=True)
+
+    def save(self, *args, **kwargs):
+        if self.bucket is None:
+            self.bucket = expiry_bucket(self.exp)
+
+        super().save(*args, **kwargs)
 
 
 class ActiveToken(models.Model):
     token_string = models.CharField(max_length=30, unique=True)
     owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     exp = models.IntegerField()
+    last_seen = models.IntegerField(null=True, blank=True)
+    # refresh token rotation: current generation of the session, and when it was reached
+    generation = models.PositiveIntegerField(default=0)
+    rotated_at = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # listing the sessions of a user, keyset-paginated on (exp, id)
+            models.Index(fields=["owner", "exp", "id"], name="jwtauth_active_owner_exp"),
+        ]
@@ -0,0 +1,100 @@
+import json
+
+from django.contrib.auth.models import Permission, PermissionsMixin
+from django.db.models import Q
+
+from jwtauth.settings import api_settings
+
+# attribute of the user object holding the snapshot of the access token it was loaded from
+SNAPSHOT_ATTR = "_jwtauth_permissions"
+
+GROUPS_KEY = "g"
+PERMISSIONS_KEY = "p"
+
+
+def build_snapshot(user) -> dict | None:
+    """
+    Build a compact snapshot of the user's groups and permissions, to be embedded in an
+    access token. Permissions are grouped by app label, e.g.:
+
+        {"g": ["editors"], "p": {"blog": ["add_post", "change_post"]}}
+
+    Returns None when the user model has no groups and permissions, or when the encoded
+    snapshot exceeds PERMISSIONS_CLAIM_MAX_SIZE bytes.
+    """
+    if not isinstance(user, PermissionsMixin):
+        return None
+
+    snapshot = {GROUPS_KEY: sorted(user.groups.values_list("name", flat=True))}
+
+    # superusers are granted every permission by User.has_perm without asking the backends,
+    # thus their (potentially large) permission set is not included
+    if not user.is_superuser:
+        permissions = {}
+
+        if user.is_active:
+            # user and group permissions in a single query
+            rows = (
+                Permission.objects.filter(Q(user=user) | Q(group__user=user))
+                .values_list("content_type__app_label", "codename")
+                .distinct()
+            )
+
+            for app_label, codename in sorted(rows):
+                permissions.setdefault(app_label, []).append(codename)
+
+        snapshot[PERMISSIONS_KEY] = permissions
+
+    size = len(json.dumps(snapshot, separators=(",", ":")).encode())
+
+    if size > api_settings.PERMISSIONS_CLAIM_MAX_SIZE:
+        # too large to travel in a cookie, permission checks will fall back to the database
+        return None
+
+    return snapshot
+
+
+def attach_snapshot(user, snapshot: dict | None) -> None:
+    if snapshot is None:
+        if hasattr(user, SNAPSHOT_ATTR):
+            delattr(user, SNAPSHOT_ATTR)
+    else:
+        setattr(user, SNAPSHOT_ATTR, snapshot)
+
+
+def get_snapshot(user) -> dict | None:
+    return getattr(user, SNAPSHOT_ATTR, None)
+
+
+def snapshot_permissions(user) -> set[str] | None:
+    """The permissions of the user ("app_label.codename") according to its snapshot, if any."""
+    snapshot = get_snapshot(user)
+
+    if snapshot is None or PERMISSIONS_KEY not in snapshot:
+        return None
+
+    return {
+        f"{app_label}.{codename}"
+        for app_label, codenames in snapshot[PERMISSIONS_KEY].items()
+        for codename in codenames
+    }
+
+
+def user_groups(user) -> set[str]:
+    """
+    The names of the groups the user belongs to, answered from the access token snapshot
+    when available and from the database otherwise.
+    """
+    snapshot = get_snapshot(user)
+
+    if snapshot is not None:
+        return set(snapshot[GROUPS_KEY])
+
+    if not user.is_authenticated or not isinstance(user, PermissionsMixin):
+        return set()
+
+    return set(user.groups.values_list("name", flat=True))
+
+
+def in_group(user, name: str) -> bool:
+    return name in user_groups(user)
@@ -0,0 +1,120 @@
+"""
+pytest plugin providing fast authenticated clients, registered through the pytest11 entry point
+(or with pytest_plugins = ["jwtauth.pytest_plugin"] in conftest.py).
+
+Rather than logging in through a view, the tokens are minted directly and set as cookies:
+
+    def test_profile(client, user, jwtauth_login):
+        session = jwtauth_login(client, user)
+        assert client.get("/profile/").status_code == 200
+
+        session.revoke()
+        assert client.get("/profile/").status_code == 401
+"""
+
+from datetime import timedelta
+
+import pytest
+
+# tokens minted with this duration are expired right away, no need to wait
+EXPIRED = timedelta(seconds=-1)
+
+
+class JwtSession:
+    """
+    The tokens of a client logged in by jwtauth_login.
+
+    With in_memory=True the session is not inserted in the database: it is held in the
+    write-behind queue of the test process, where it is considered active (see SessionWriter.hold).
+    The tokens are issued for the given tenant, if any (see the TENANTS setting).
+    """
+
+    def __init__(self, client, user, in_memory: bool = False, tenant=None):
+        self.client = client
+        self.user = user
+        self.in_memory = in_memory
+        self.tenant = tenant
+        self.access_token = None
+        self.refresh_token = None
+        self.issue()
+
+    def issue(self, access_duration: timedelta = None, refresh_duration: timedelta = None) -> None:
+        """Mint a new pair of tokens (default lifetimes unless specified) and set them as cookies."""
+        # imported here: plugins are loaded before Django is configured
+        from jwtauth.manager import ACCESS_TOKEN_KEY, REFRESH_TOKEN_KEY
+        from jwtauth.models import ActiveToken
+        from jwtauth.tokens import AccessToken, RefreshToken
+        from jwtauth.writer import session_writer
+
+        self.close()
+
+        self.access_token = AccessToken(from_user=self.user, duration=access_duration, tenant=self.tenant)
+        self.refresh_token = RefreshToken(from_user=self.user, duration=refresh_duration, tenant=self.tenant)
+
+        session = ActiveToken(
+            token_string=self.refresh_token.token_string,
+            owner=self.user,
+            exp=self.refresh_token.exp,
+            last_seen=self.refresh_token.iat,
+        )
+
+        if self.in_memory:
+            session_writer.hold(session)
+        else:
+            session_writer.insert(session)
+
+        self.client.cookies[ACCESS_TOKEN_KEY] = self.access_token.encoding
+        self.client.cookies[REFRESH_TOKEN_KEY] = self.refresh_token.encoding
+
+    def expire_access(self) -> None:
+        """Expire the access token only: the next request is silently refreshed."""
+        from jwtauth.manager import ACCESS_TOKEN_KEY
+        from jwtauth.tokens import AccessToken
+
+        self.access_token = AccessToken(from_user=self.user, duration=EXPIRED, tenant=self.tenant)
+        self.client.cookies[ACCESS_TOKEN_KEY] = self.access_token.encoding
+
+    def expire(self) -> None:
+        """Expire both tokens: the client has to log in again."""
+        self.issue(access_duration=EXPIRED, refresh_duration=EXPIRED)
+
+    def revoke(self) -> None:
+        """Revoke the session, as logging out would."""
+        from jwtauth.models import BlacklistedToken
+
+        self.close()
+        BlacklistedToken.objects.create(token_string=self.refresh_token.token_string, exp=self.refresh_token.exp)
+
+    def close(self) -> None:
+        """End the session without blacklisting it, dropping it from the in-memory store."""
+        from jwtauth.models import ActiveToken
+        from jwtauth.writer import session_writer
+
+        if self.refresh_token is None:
+            return
+
+        session_writer.discard(self.refresh_token.token_string)
+
+        if not self.in_memory:
+            ActiveToken.objects.filter(token_string=self.refresh_token.token_string).delete()
+
+
+@pytest.fixture
+def jwtauth_login():
+    """
+    Factory logging a test client (Django's or REST framework's) in as the given user:
+    jwtauth_login(client, user, in_memory=False, tenant=None) returns a JwtSession.
+    """
+    sessions = []
+
+    def login(client, user, in_memory: bool = False, tenant=None) -> JwtSession:
+        session = JwtSession(client, user, in_memory, tenant)
+        sessions.append(session)
+        return session
+
+    yield login
+
+    for session in sessions:
+        if session.in_memory:
+            # the database may not be available anymore, only the queue is cleared
+            session.close()
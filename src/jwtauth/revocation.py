@@ -0,0 +1,119 @@
+from calendar import timegm
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from jwtauth.models import ActiveToken, BlacklistedToken, expiry_bucket
+
+BATCH_SIZE = 1000
+
+# maximum number of sessions evicted at once, per user
+EVICTION_BATCH_SIZE = 100
+
+
+def blacklist_rows(rows, now: int) -> None:
+    """Blacklist the given (token_string, exp) pairs. Expired tokens are rejected anyway, they are skipped."""
+    BlacklistedToken.objects.bulk_create(
+        [
+            BlacklistedToken(token_string=token_string, exp=exp, bucket=expiry_bucket(exp))
+            for token_string, exp in rows
+            if exp > now
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def revoke_sessions(queryset) -> int:
+    """
+    Revoke every session of the given ActiveToken queryset: the sessions are ended and their
+    (still alive) refresh tokens blacklisted, with set-based queries rather than per-row ones.
+
+    Returns the number of revoked sessions.
+    """
+    now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+
+    with transaction.atomic():
+        rows = list(queryset.values_list("id", "token_string", "exp"))
+
+        blacklist_rows([(token_string, exp) for _, token_string, exp in rows], now)
+
+        ids = [pk for pk, _, _ in rows]
+
+        for i in range(0, len(ids), BATCH_SIZE):
+            ActiveToken.objects.filter(id__in=ids[i : i + BATCH_SIZE]).delete()
+
+    # imported here, the writer depends on this module
+    from jwtauth.writer import session_writer
+
+    for _, token_string, _ in rows:
+        session_writer.discard(token_string)
+
+    return len(rows)
+
+
+def retire_expired_buckets(now: int = None) -> int:
+    """
+    Delete the revocations of every bucket (see REVOCATION_BUCKET_SIZE) whose window has ended:
+    their tokens are all expired, thus rejected anyway. This is a single DELETE on the bucket index,
+    rather than a scan of the expiry times.
+
+    Returns the number of deleted revocations.
+    """
+    if now is None:
+        now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+
+    count, _ = BlacklistedToken.objects.filter(bucket__lte=now).delete()
+    return count
+
+
+def revoke_user_sessions(users) -> int:
+    """
+    Revoke all the sessions of the given users (a user, a user queryset or a list of user ids),
+    including the sessions still waiting in the write-behind queue of this process.
+    """
+    from jwtauth.writer import session_writer
+
+    if hasattr(users, "pk"):
+        owner_ids = {users.pk}
+    elif isinstance(users, QuerySet) and users.model is get_user_model():
+        owner_ids = set(users.values_list("pk", flat=True))
+    else:
+        owner_ids = set(users)
+
+    now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+    queued = session_writer.discard_owners(owner_ids)
+
+    with transaction.atomic():
+        # not written, yet valid while considered pending: blacklisted
+        blacklist_rows([(token.token_string, token.exp) for token in queued], now)
+        count = revoke_sessions(ActiveToken.objects.filter(owner_id__in=owner_ids))
+
+    return count + len(queued)
+
+
+def evict_sessions(owner_ids, limit: int) -> int:
+    """
+    Revoke the oldest sessions of the given users, so that each of them keeps at most `limit`
+    sessions (evicting at most EVICTION_BATCH_SIZE sessions per user at once). Meant to be
+    called in the transaction inserting the new sessions.
+
+    Returns the number of revoked sessions.
+    """
+    owner_ids = sorted(owner_ids)
+
+    # concurrent logins of the same users wait for each other (on databases supporting it)
+    list(get_user_model()._default_manager.select_for_update().filter(pk__in=owner_ids).values_list("pk"))
+
+    # rank the sessions of every user, most recent first, in a single query
+    excess = (
+        ActiveToken.objects.filter(owner_id__in=owner_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F("owner_id"), order_by=[F("exp").desc(), F("id").desc()]))
+        .filter(rank__gt=limit, rank__lte=limit + EVICTION_BATCH_SIZE)
+        .values_list("id", flat=True)
+    )
+
+    return revoke_sessions(ActiveToken.objects.filter(id__in=list(excess)))
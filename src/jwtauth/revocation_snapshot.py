@@ -0,0 +1,150 @@
+import mmap
+import os
+import struct
+import tempfile
+import time
+from bisect import bisect_left
+from calendar import timegm
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.db.models import Max
+
+from jwtauth.models import BlacklistedToken
+from jwtauth.settings import api_settings
+
+MAGIC = b"JWTREVS1"
+
+# magic, watermark (revocations above it must be queried), number of records
+HEADER = struct.Struct("<8sQQ")
+
+# token strings are stored NUL-padded to the width of the column
+RECORD_SIZE = BlacklistedToken._meta.get_field("token_string").max_length
+
+
+def encode_record(token_string: str) -> bytes:
+    return token_string.encode().ljust(RECORD_SIZE, b"\0")
+
+
+def write_revocation_snapshot(path: str) -> tuple[int, int]:
+    """
+    Write the snapshot of the unexpired revoked tokens to the given path, atomically: readers see
+    either the previous file or the new one. Returns the number of tokens and the watermark.
+
+    Ids are allocated before the revoking transactions commit, so a revocation with a lower id than
+    the highest one read may still be in flight. The watermark is therefore conservative: it is
+    REVOCATION_SNAPSHOT_OVERLAP ids below the highest id, and readers keep querying the database
+    for the revocations above it (the ones already in the snapshot included).
+    """
+    now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+
+    with transaction.atomic():
+        highest = BlacklistedToken.objects.aggregate(highest=Max("id"))["highest"] or 0
+        watermark = max(highest - api_settings.REVOCATION_SNAPSHOT_OVERLAP, 0)
+        token_strings = (
+            BlacklistedToken.objects.filter(id__lte=highest, exp__gt=now)
+            .values_list("token_string", flat=True)
+            .iterator()
+        )
+
+        # sorted in Python, database collations may not order bytes
+        records = sorted(encode_record(token_string) for token_string in token_strings)
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".jwtauth-revocations-")
+
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(HEADER.pack(MAGIC, watermark, len(records)))
+            file.writelines(records)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return len(records), watermark
+
+
+class RevocationSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file: the pages are shared by every process of the
+    host mapping the same file, and lookups are binary searches over the sorted records.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # the file is replaced rather than modified, this identifies its version
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+
+        magic, self.watermark, self.count = HEADER.unpack_from(self.map)
+
+        if magic != MAGIC or len(self.map) != HEADER.size + self.count * RECORD_SIZE:
+            raise Exception(f"Invalid revocation snapshot: {path}")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+
+        start = HEADER.size + index * RECORD_SIZE
+        return self.map[start : start + RECORD_SIZE]
+
+    def __contains__(self, token_string: str) -> bool:
+        record = encode_record(token_string)
+        index = bisect_left(self, record)
+        return index < self.count and self[index] == record
+
+
+class SnapshotLoader:
+    """Keeps the snapshot of REVOCATION_SNAPSHOT_PATH mapped, remapping it when the file is replaced."""
+
+    def __init__(self):
+        self.snapshot = None
+        self.checked_at = None
+
+    def get(self) -> RevocationSnapshot | None:
+        path = api_settings.REVOCATION_SNAPSHOT_PATH
+
+        if path is None:
+            return None
+
+        now = time.monotonic()
+        snapshot = self.snapshot
+        check_interval = api_settings.REVOCATION_SNAPSHOT_CHECK_INTERVAL.total_seconds()
+
+        if snapshot is not None and snapshot.path == path and now - self.checked_at < check_interval:
+            return snapshot
+
+        self.checked_at = now
+
+        try:
+            stat = os.stat(path)
+
+        except FileNotFoundError:
+            # not written yet, every revocation is looked up in the database
+            self.snapshot = None
+            return None
+
+        if snapshot is None or snapshot.path != path or snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+            # the previous mapping is released once no thread uses it anymore
+            self.snapshot = RevocationSnapshot(path)
+
+        return self.snapshot
+
+
+snapshot_loader = SnapshotLoader()
+
+
+def get_revocation_snapshot() -> RevocationSnapshot | None:
+    return snapshot_loader.get()
@@ -0,0 +1,49 @@
+from calendar import timegm
+from datetime import datetime, timezone
+
+from django.db.models import Q
+
+from jwtauth.models import ActiveToken
+from jwtauth.revocation import revoke_sessions
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(session: ActiveToken) -> str:
+    return f"{session.exp}.{session.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Raises ValueError if the cursor is malformed."""
+    exp, pk = cursor.split(".")
+    return int(exp), int(pk)
+
+
+def list_sessions(user, cursor: str = None, limit: int = PAGE_SIZE) -> tuple[list[ActiveToken], str | None]:
+    """
+    Returns a page of the unexpired sessions of the given user, most recent first, and the cursor
+    of the next page (None on the last page).
+
+    Pages are keyset-paginated on (exp, id), which is served by the (owner, exp, id) index
+    regardless of how deep the page is.
+    """
+    now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+    queryset = ActiveToken.objects.filter(owner=user, exp__gt=now).order_by("-exp", "-id")
+
+    if cursor:
+        exp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(exp__lt=exp) | Q(exp=exp, id__lt=pk))
+
+    # one extra row tells whether there is a next page
+    sessions = list(queryset[: limit + 1])
+
+    if len(sessions) > limit:
+        return sessions[:limit], encode_cursor(sessions[limit - 1])
+
+    return sessions, None
+
+
+def revoke_session(user, session_id) -> bool:
+    """Revoke the session with the given id if it belongs to the user. Returns whether it was found."""
+    return revoke_sessions(ActiveToken.objects.filter(owner=user, id=session_id)) > 0
@@ -13,18 +13,75 @@ DEFAULTS = {
     "REFRESH_TOKEN_COOKIE_NAME": "refresh_token",
     "ALGORITHM": "HS256",
     "SIGNING_KEY": settings.SECRET_KEY,
+    "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_PROFILE": "default",
+    "JSON_CODEC": "auto",
+    # tenants
+    "TENANT_RESOLVER": None,
+    "TENANTS": {},
+    "TENANT_KEY_CACHE_SIZE": 128,
+    # session bookkeeping
+    "WRITE_BEHIND": False,
+    "WRITE_BEHIND_BATCH_SIZE": 500,
+    "WRITE_BEHIND_FLUSH_INTERVAL": timedelta(seconds=5),
+    "WRITE_BEHIND_MAX_QUEUE_SIZE": 10000,
+    "TRACK_LAST_SEEN": False,
+    "MAX_SESSIONS_PER_USER": None,
+    "ROTATE_REFRESH_TOKENS": False,
+    "REFRESH_REUSE_INTERVAL": timedelta(seconds=10),
+    "REVOCATION_SNAPSHOT_PATH": None,
+    "REVOCATION_SNAPSHOT_CHECK_INTERVAL": timedelta(seconds=1),
+    "REVOCATION_SNAPSHOT_OVERLAP": 1000,
+    "REVOCATION_BUCKET_SIZE": timedelta(days=1),
+    # degraded mode
+    "DB_BREAKER": False,
+    "DB_BREAKER_FAILURE_THRESHOLD": 5,
+    "DB_BREAKER_RESET_TIMEOUT": timedelta(seconds=30),
+    "DB_QUERY_TIMEOUT": timedelta(milliseconds=250),
+    "DEGRADED_STALENESS": timedelta(minutes=5),
+    "DEGRADED_CACHE_SIZE": 10000,
+    "DEGRADED_FAIL_CLOSED": ("login", "refresh"),
+    # user loading
+    "USER_QUERY_ONLY": (),
+    "USER_SELECT_RELATED": (),
+    "USER_PREFETCH_RELATED": (),
+    "USER_CACHE_TIMEOUT": None,
+    "USER_CACHE_ALIAS": "default",
+    # introspection
+    "INTROSPECTION_MAX_AGE": timedelta(seconds=30),
+    # websockets
+    "WEBSOCKET_RECHECK_INTERVAL": timedelta(minutes=1),
+    # permissions
+    "PERMISSIONS_CLAIM": False,
+    "PERMISSIONS_CLAIM_MAX_SIZE": 1024,
 }
 
-api_settings = APISettings(USER_SETTINGS, DEFAULTS, ())
+# settings given as dotted paths
+IMPORT_STRINGS = ("TENANT_RESOLVER",)
 
 
-def reload_api_settings(**kwargs) -> None:
-    global api_settings
+class JwtAuthSettings(APISettings):
+    """
+    APISettings reading the JWTAUTH dictionary rather than REST_FRAMEWORK, so that
+    reload() (and therefore override_settings) works in place.
+    """
+
+    @property
+    def user_settings(self):
+        if not hasattr(self, "_user_settings"):
+            self._user_settings = getattr(settings, "JWTAUTH", None) or {}
+        return self._user_settings
+
 
-    setting, value = kwargs["setting"], kwargs["value"]
+api_settings = JwtAuthSettings(USER_SETTINGS, DEFAULTS, IMPORT_STRINGS)
+
+
+def reload_api_settings(**kwargs) -> None:
+    setting = kwargs["setting"]
 
     if setting == "JWTAUTH":
-        api_settings = APISettings(value, DEFAULTS, ())
+        # reload in place, modules holding a reference to api_settings see the new values
+        api_settings.reload()
 
 
 setting_changed.connect(reload_api_settings)
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+
+import jwt
+from django.http.request import split_domain_port
+
+from jwtauth.settings import api_settings
+from jwtauth.signatures import KID as TENANT_HEADER
+
+
+class TenantConfig:
+    """The signing configuration of a tenant (or the global one, for tenant None)."""
+
+    __slots__ = ("tenant", "signing_key", "verifying_key", "algorithm", "access_lifetime", "refresh_lifetime")
+
+    def __init__(self, tenant, signing_key, verifying_key, algorithm, access_lifetime, refresh_lifetime):
+        self.tenant = tenant
+        self.signing_key = signing_key
+        self.verifying_key = verifying_key
+        self.algorithm = algorithm
+        self.access_lifetime = access_lifetime
+        self.refresh_lifetime = refresh_lifetime
+
+
+def get_tenant_config(tenant=None) -> TenantConfig:
+    """
+    Returns the configuration of the given tenant (see the TENANTS setting), the settings missing
+    from its entry falling back to the global ones. Tenant None is the global configuration.
+    """
+    config = {}
+
+    if tenant is not None:
+        config = api_settings.TENANTS.get(tenant)
+
+        if config is None:
+            raise Exception(f"Unknown tenant '{tenant}'.")
+
+    signing_key = config.get("SIGNING_KEY", api_settings.SIGNING_KEY)
+
+    return TenantConfig(
+        tenant,
+        signing_key,
+        # asymmetric algorithms verify with the public key
+        config.get("VERIFYING_KEY", signing_key),
+        config.get("ALGORITHM", api_settings.ALGORITHM),
+        config.get("ACCESS_TOKEN_LIFETIME", api_settings.ACCESS_TOKEN_LIFETIME),
+        config.get("REFRESH_TOKEN_LIFETIME", api_settings.REFRESH_TOKEN_LIFETIME),
+    )
+
+
+class KeyCache:
+    """
+    Bounded store (least recently used entries are dropped first) of the keys prepared for PyJWT,
+    so that keys (e.g. PEM encoded RSA keys) are not parsed again for every token. At most
+    TENANT_KEY_CACHE_SIZE keys are kept.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (algorithm, key) -> prepared key
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, algorithm: str):
+        entry = (algorithm, key)
+
+        with self.lock:
+            prepared = self.entries.get(entry)
+
+            if prepared is not None:
+                self.hits += 1
+                self.entries.move_to_end(entry)
+                return prepared
+
+        prepared = jwt.get_algorithm_by_name(algorithm).prepare_key(key)
+
+        with self.lock:
+            self.misses += 1
+            self.entries[entry] = prepared
+
+            while len(self.entries) > api_settings.TENANT_KEY_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+        return prepared
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def metrics(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+key_cache = KeyCache()
+
+
+def resolve_tenant(request):
+    """The tenant of the given request, according to the TENANT_RESOLVER setting (None if unset)."""
+    resolver = api_settings.TENANT_RESOLVER
+
+    if resolver is None:
+        return None
+
+    return resolver(request)
+
+
+def tenant_from_host(request):
+    """Tenant resolver: the host of the request (without port), if it is one of the TENANTS."""
+    host, _ = split_domain_port(request.META.get("HTTP_HOST", ""))
+    return host if host in api_settings.TENANTS else None
+
+
+def tenant_from_token(request):
+    """
+    Tenant resolver: the tenant named by the header of the tokens of the request (Authorization
+    header first, then cookies), if it is one of the TENANTS. The header is not trusted: it only
+    selects the key the tokens are then verified with.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "").split()
+    encodings = [header[1]] if len(header) == 2 and header[0] in api_settings.AUTH_HEADER_TYPES else []
+
+    for name in (api_settings.ACCESS_TOKEN_COOKIE_NAME, api_settings.REFRESH_TOKEN_COOKIE_NAME):
+        if name in request.COOKIES:
+            encodings.append(request.COOKIES[name])
+
+    for encoding in encodings:
+        try:
+            tenant = jwt.get_unverified_header(encoding).get(TENANT_HEADER)
+        except jwt.InvalidTokenError:
+            continue
+
+        if isinstance(tenant, str) and tenant in api_settings.TENANTS:
+            return tenant
+
+    return None
@@ -1,27 +1,47 @@
 from calendar import timegm
+from copy import copy
 from datetime import datetime, timedelta, timezone
 
 import jwt
-from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Subquery
 
+from jwtauth.breaker import db_breaker
+from jwtauth.codec import get_jwt
 from jwtauth.models import ActiveToken, BlacklistedToken
+from jwtauth.permissions import attach_snapshot, build_snapshot
+from jwtauth.revocation import revoke_sessions
+from jwtauth.revocation_snapshot import get_revocation_snapshot
 from jwtauth.settings import api_settings
-from jwtauth.utils import generate_unique_token
+from jwtauth.signatures import EXP, IAT
+from jwtauth.tenants import TENANT_HEADER, get_tenant_config, key_cache
+from jwtauth.users import load_user, load_user_annotated
+from jwtauth.utils import generate_compact_token, generate_token, generate_unique_token
+from jwtauth.writer import session_writer
 
-IAT = "iat"
-EXP = "exp"
-
-UserModel = get_user_model()
+# token profiles, see the TOKEN_PROFILE setting
+DEFAULT_PROFILE = "default"
+COMPACT_PROFILE = "compact"
 
 
 class Token:
+    """
+    A JWT token. Tokens are created for every request, thus they are kept lean: the claims are
+    stored once, in a single dictionary, and every other field is derived from them on access.
+    """
+
+    __slots__ = ("encoding", "claims", "is_valid", "duration", "tenant")
+
     registered_claims = [IAT, EXP]
 
+    # short names of the claims in the compact profile
+    compact_claims = {}
+
     def __init__(
         self,
         from_encoding: str = None,
         from_data: dict = None,
         duration: timedelta = None,
+        tenant=None,
     ):
         """
         Initialize a JWT token, either decoding it from a string or encoding it from data.
@@ -32,6 +52,8 @@ class Token:
             the token will be encoded.
         :param duration: The duration for which the token is valid. Converted into integer
             seconds and used to set the expiration field of the JWT.
+        :param tenant: The tenant whose signing configuration is used (see the TENANTS setting),
+            None for the global one. Tokens issued for another tenant are invalid.
         """
         if not from_encoding and not from_data:
             raise Exception("Please specify either the data or the encoding to create the token.")
@@ -42,18 +64,13 @@ class Token:
                 "encoding from which to derive the data, not both."
             )
 
-        if from_data and not timedelta:
+        if from_data and duration is None:
             raise Exception("Please specify a duration for the token.")
 
-        self.data = None
         self.encoding = None
-
-        self.jwt_data = None  # user data + jwt fields
+        self.claims = None  # user data + jwt fields
         self.is_valid = None
-
-        # jwt data
-        self.iat = None
-        self.exp = None
+        self.tenant = tenant
 
         if from_encoding:
             self.is_valid = self.decode(from_encoding)
@@ -63,29 +80,64 @@ class Token:
             self.encode(from_data)
             self.is_valid = True
 
-    def encode(self, data) -> None:
-        self.data = data
+    @property
+    def jwt_data(self) -> dict | None:
+        return self.claims
+
+    @property
+    def data(self) -> dict | None:
+        """The claims, except for the jwt registered claims."""
+        if self.claims is None:
+            return None
+
+        return {k: v for k, v in self.claims.items() if k not in Token.registered_claims}
 
+    @property
+    def iat(self) -> int | None:
+        return self.claims[IAT] if self.claims else None
+
+    @property
+    def exp(self) -> int | None:
+        return self.claims[EXP] if self.claims else None
+
+    def encode(self, data) -> None:
         # time in seconds since epoch
-        self.iat = timegm(datetime.now(tz=timezone.utc).utctimetuple())
-        self.exp = self.iat + self.duration
+        iat = timegm(datetime.now(tz=timezone.utc).utctimetuple())
 
-        self.jwt_data = {
-            **self.data,
-            IAT: self.iat,
-            EXP: self.exp,
+        self.claims = {
+            **data,
+            IAT: iat,
+            EXP: iat + self.duration,
         }
 
-        self.encoding = jwt.encode(self.jwt_data, api_settings.SIGNING_KEY, algorithm=api_settings.ALGORITHM)
+        self.sign()
+
+    def sign(self) -> None:
+        """Encode the claims of this token into its encoding."""
+        # the compact profile also drops the redundant "typ" header
+        headers = {"typ": None} if self.compact() else {}
+
+        if self.tenant is not None:
+            headers[TENANT_HEADER] = self.tenant
+
+        config = get_tenant_config(self.tenant)
+
+        self.encoding = get_jwt(api_settings.JSON_CODEC).encode(
+            self.claims,
+            key_cache.get(config.signing_key, config.algorithm),
+            algorithm=config.algorithm,
+            headers=headers or None,
+        )
 
     def decode(self, data) -> bool:
         self.encoding = data
+        config = get_tenant_config(self.tenant)
 
         try:
-            self.jwt_data = jwt.decode(
+            decoded = get_jwt(api_settings.JSON_CODEC).decode_complete(
                 self.encoding,
-                api_settings.SIGNING_KEY,
-                algorithms=[api_settings.ALGORITHM],
+                key_cache.get(config.verifying_key, config.algorithm),
+                algorithms=[config.algorithm],
                 options={
                     # if the token is expired we still want to have an instance with expired=True,
                     # thus we verify exp ourselves rather than having jwt throw an exception
@@ -94,19 +146,52 @@ class Token:
                 },
             )
 
-            self.data = self.jwt_data.copy()
+        except jwt.InvalidTokenError:
+            return False
+
+        if decoded["header"].get(TENANT_HEADER) != self.tenant:
+            # issued for another tenant (or for none), even if the keys happen to be the same
+            return False
 
-            # remove jwt registered claims from user data
-            for k in Token.registered_claims:
-                self.data.pop(k)
+        self.claims = decoded["payload"]
+        return True
 
-            self.iat = self.jwt_data[IAT]
-            self.exp = self.jwt_data[EXP]
+    @staticmethod
+    def compact() -> bool:
+        profile = api_settings.TOKEN_PROFILE
 
-            return True
+        if profile not in (DEFAULT_PROFILE, COMPACT_PROFILE):
+            raise Exception(f"Unknown token profile '{profile}'.")
 
-        except jwt.InvalidTokenError:
-            return False
+        return profile == COMPACT_PROFILE
+
+    def claim_name(self, name: str) -> str:
+        """The name under which the given claim is encoded in the current profile."""
+        if self.compact():
+            return self.compact_claims.get(name, name)
+
+        return name
+
+    def get_claim(self, name: str):
+        """
+        Returns the value of the given claim, or None if missing. Both the default and the
+        compact claim names are accepted, so that tokens issued before a profile switch
+        remain valid until they expire.
+        """
+        if self.claims is None:
+            return None
+
+        return self.lookup_claim(self.claims, name)
+
+    @classmethod
+    def lookup_claim(cls, data: dict, name: str):
+        """Like get_claim, looking up the claim in the given (decoded) data."""
+        short_name = cls.compact_claims.get(name)
+
+        if short_name is not None and short_name in data:
+            return data[short_name]
+
+        return data.get(name)
 
     def valid(self) -> bool:
         return self.is_valid
@@ -127,112 +212,310 @@ class UserToken(Token):
     This token is used by both access and refresh tokens.
     """
 
+    __slots__ = ("user", "users")
+
     USER_ID_KEY = "user_id"
 
-    def __init__(self, *args, **kwargs):
+    compact_claims = {USER_ID_KEY: "u"}
+
+    def __init__(self, *args, users=None, **kwargs):
+        """
+        :param users: Optional per-request memo (user id -> user) shared between the tokens
+            of a request, so that the user is loaded only once.
+        """
         self.user = None
+        self.users = users
         super().__init__(*args, **kwargs)
 
     def encode(self, user, data=None) -> None:
         self.user = user
 
-        super().encode({**(data or {}), self.USER_ID_KEY: user.id})
+        super().encode({**(data or {}), self.claim_name(self.USER_ID_KEY): user.id})
 
     def decode(self, data) -> bool:
         if not super().decode(data):
             return False
 
-        if self.USER_ID_KEY not in self.jwt_data:
+        user_id = self.get_claim(self.USER_ID_KEY)
+
+        if user_id is None:
             return False
 
-        try:
-            self.user = UserModel.objects.get(id=self.jwt_data[self.USER_ID_KEY])
+        self.user = self.resolve_user(user_id)
 
-        except UserModel.DoesNotExist:
-            # no user with the given ID
-            return False
+        # no user (or multiple users) with the given ID
+        return self.user is not None
 
-        except UserModel.MultipleObjectsReturned:
-            # multiple users with the same ID
-            return False
+    def resolve_user(self, user_id):
+        if self.users is not None and user_id in self.users:
+            # loaded by another token of the same request
+            return self.users[user_id]
 
-        return True
+        return db_breaker.call(("user", user_id), lambda: load_user(user_id, self.users))
 
 
 class AccessToken(UserToken):
+    __slots__ = ()
+
+    PERMISSIONS_KEY = "perms"
+
+    compact_claims = {**UserToken.compact_claims, PERMISSIONS_KEY: "p"}
+
     def __init__(
         self,
         from_encoding=None,
         from_user=None,
-        duration=api_settings.ACCESS_TOKEN_LIFETIME,
+        duration=None,
+        users=None,
+        tenant=None,
     ):
         super().__init__(
             from_encoding=from_encoding,
             from_data=from_user,
-            duration=duration,
+            duration=get_tenant_config(tenant).access_lifetime if duration is None else duration,
+            users=users,
+            tenant=tenant,
         )
 
+    def encode(self, user, data=None) -> None:
+        if not api_settings.PERMISSIONS_CLAIM:
+            super().encode(user, data)
+            return
+
+        snapshot = build_snapshot(user)
+
+        # the user now carries the fresh snapshot (possibly replacing the one of an expired token)
+        attach_snapshot(user, snapshot)
+
+        if snapshot is not None:
+            data = {**(data or {}), self.claim_name(self.PERMISSIONS_KEY): snapshot}
+
+        super().encode(user, data)
+
+    def decode(self, data) -> bool:
+        if not super().decode(data):
+            return False
+
+        snapshot = self.get_claim(self.PERMISSIONS_KEY)
+
+        if api_settings.PERMISSIONS_CLAIM and snapshot is not None:
+            attach_snapshot(self.user, snapshot)
+
+        return True
+
 
 class RefreshToken(UserToken):
+    __slots__ = ("active", "revoked", "session_generation", "rotated_at")
+
     TOKEN_STRING_KEY = "token_string"
+    GENERATION_KEY = "gen"
+
+    compact_claims = {**UserToken.compact_claims, TOKEN_STRING_KEY: "t", GENERATION_KEY: "g"}
 
     def __init__(
         self,
         from_encoding=None,
         from_user=None,
-        duration=api_settings.REFRESH_TOKEN_LIFETIME,
+        duration=None,
+        users=None,
+        tenant=None,
     ):
-        self.token_string = None
+        # session state, as found in the database when decoding
+        self.active = True
+        self.revoked = None
+        self.session_generation = None  # only looked up when ROTATE_REFRESH_TOKENS is enabled
+        self.rotated_at = None
+
         super().__init__(
             from_encoding=from_encoding,
             from_data=from_user,
-            duration=duration,
+            duration=get_tenant_config(tenant).refresh_lifetime if duration is None else duration,
+            users=users,
+            tenant=tenant,
         )
 
+    @property
+    def token_string(self) -> str | None:
+        return self.get_claim(self.TOKEN_STRING_KEY)
+
+    @property
+    def generation(self) -> int:
+        """How many times the session was rotated when this token was issued (see rotate)."""
+        return self.get_claim(self.GENERATION_KEY) or 0
+
     def encode(self, user, data=None) -> None:
-        self.token_string = generate_unique_token()
-        super().encode(user, {self.TOKEN_STRING_KEY: self.token_string})
+        token_string = generate_unique_token(generate_compact_token if self.compact() else generate_token)
+        super().encode(user, {self.claim_name(self.TOKEN_STRING_KEY): token_string})
+
+    def resolve_user(self, user_id):
+        if self.token_string is None:
+            return None
+
+        # revocations up to the watermark are found in the snapshot, only newer ones are queried
+        snapshot = get_revocation_snapshot()
+        watermark = snapshot.watermark if snapshot is not None else None
+
+        # the user, the active session and the blacklist in a single query
+        annotations = self.session_annotations(self.token_string, watermark)
+        user, values = db_breaker.call(
+            ("session", self.token_string),
+            lambda: load_user_annotated(user_id, annotations, self.users),
+            (None, None),
+        )
 
-    def decode(self, data) -> bool:
-        if not super().decode(data):
-            return False
+        if user is None:
+            return None
+
+        if self.users is not None:
+            # the last known user may have been served, share it with the other tokens
+            self.users.setdefault(user_id, user)
+
+        self.revoked = values["jwtauth_revoked"] or (snapshot is not None and self.token_string in snapshot)
+        self.active = values["jwtauth_active"] or self.pending()
+        self.session_generation = values.get("jwtauth_generation")
+        self.rotated_at = values.get("jwtauth_rotated_at")
+        return user
+
+    @staticmethod
+    def session_annotations(token_string, watermark: int = None) -> dict:
+        """
+        Annotations of the user row telling whether the session is active and whether it is revoked
+        (only considering the revocations above the watermark, if given), as well as its generation
+        when refresh tokens are rotated.
+        """
+        session = ActiveToken.objects.filter(token_string=token_string, owner=OuterRef("pk"))
+        revocations = BlacklistedToken.objects.filter(token_string=token_string)
 
-        if self.TOKEN_STRING_KEY not in self.data:
+        if watermark is not None:
+            revocations = revocations.filter(id__gt=watermark)
+
+        annotations = {
+            "jwtauth_active": Exists(session),
+            "jwtauth_revoked": Exists(revocations),
+        }
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            annotations["jwtauth_generation"] = Subquery(session.values("generation")[:1])
+            annotations["jwtauth_rotated_at"] = Subquery(session.values("rotated_at")[:1])
+
+        return annotations
+
+    def pending(self) -> bool:
+        """
+        Whether the session might be waiting to be written by the write-behind queue, either of this
+        process or, for recent tokens, of another one.
+        """
+        return self.session_pending(self.token_string, self.iat)
+
+    @staticmethod
+    def session_pending(token_string: str, iat: int) -> bool:
+        """Like pending, for the session with the given token string, issued at iat."""
+        if session_writer.pending(token_string):
+            return True
+
+        interval = api_settings.WRITE_BEHIND_FLUSH_INTERVAL
+
+        if not api_settings.WRITE_BEHIND or not interval:
             return False
 
-        self.token_string = self.data[self.TOKEN_STRING_KEY]
-        return True
+        age = datetime.now(tz=timezone.utc).timestamp() - iat
+        return age < 2 * interval.total_seconds()
 
     def save(self) -> ActiveToken:
         if not self.valid():
             raise Exception("Invalid token cannot be saved!")
 
-        mod = ActiveToken(token_string=self.token_string, owner=self.user, exp=self.exp)
+        mod = ActiveToken(token_string=self.token_string, owner=self.user, exp=self.exp, last_seen=self.iat)
 
-        mod.save()
+        # written immediately, or queued when write-behind is enabled
+        session_writer.insert(mod)
         return mod
 
     def blacklist(self) -> None:
         if not self.valid():
             raise Exception("Invalid token cannot be blacklisted!")
 
+        session_writer.discard(self.token_string)
         ActiveToken.objects.filter(token_string=self.token_string).delete()
 
         mod = BlacklistedToken(token_string=self.token_string, exp=self.exp)
 
         mod.save()
+        self.revoked = True
 
     def blacklisted(self) -> bool:
         if not self.is_valid:
             raise Exception("Invalid token cannot be evaluated against the blacklist!")
 
-        return BlacklistedToken.objects.filter(token_string=self.token_string).exists()
+        if self.revoked is None:
+            self.revoked = BlacklistedToken.objects.filter(token_string=self.token_string).exists()
+
+        return self.revoked
 
     def gen_access_token(self) -> AccessToken:
         if not self.valid():
             raise Exception("Invalid token cannot be used to generate an authentication token!")
 
-        return AccessToken(from_user=self.user)
+        return AccessToken(from_user=self.user, tenant=self.tenant)
+
+    def reused(self) -> bool:
+        """
+        Whether this token was replaced by a newer generation (see rotate), i.e. it is being reused.
+        The previous generation is still accepted for REFRESH_REUSE_INTERVAL after the rotation,
+        for the requests that were sent concurrently with the one rotating it.
+        """
+        return self.generation_reused(self.generation, self.session_generation, self.rotated_at)
+
+    @staticmethod
+    def generation_reused(generation: int, session_generation: int | None, rotated_at: int | None) -> bool:
+        """Like reused, for a token of the given generation of a session (None if not looked up)."""
+        if session_generation is None or generation >= session_generation:
+            return False
+
+        if generation == session_generation - 1 and rotated_at is not None:
+            now = datetime.now(tz=timezone.utc).timestamp()
+            return now - rotated_at > api_settings.REFRESH_REUSE_INTERVAL.total_seconds()
+
+        return True
+
+    def rotate(self) -> "RefreshToken | None":
+        """
+        Returns the next generation of this token: same session (token string and expiry), generation
+        claim incremented. The generation of the session is bumped with a single conditional UPDATE,
+        so that the tokens of the previous generations are rejected from now on.
+
+        Returns None if the session was not at the generation of this token (e.g. rotated by a
+        concurrent request, or still waiting in the write-behind queue).
+        """
+        if not self.valid():
+            raise Exception("Invalid token cannot be rotated!")
+
+        now = timegm(datetime.now(tz=timezone.utc).utctimetuple())
+        generation = self.generation + 1
+
+        rotated = ActiveToken.objects.filter(token_string=self.token_string, generation=self.generation).update(
+            generation=generation,
+            rotated_at=now,
+        )
+
+        if not rotated:
+            return None
+
+        token = copy(self)
+        token.claims = {**self.claims, IAT: now, self.claim_name(self.GENERATION_KEY): generation}
+        token.session_generation = generation
+        token.rotated_at = now
+        token.sign()
+        return token
+
+    def revoke_family(self) -> None:
+        """Revoke the session of this token, thus every generation of it."""
+        revoke_sessions(ActiveToken.objects.filter(token_string=self.token_string))
+        self.revoked = True
+
+    def session_alive(self) -> bool:
+        """Whether the session of this token goes on, whatever the generation of the token."""
+        return AccessToken.valid(self) and self.active and not self.blacklisted()
 
     def valid(self) -> bool:
-        return AccessToken.valid(self) and not self.blacklisted()
+        return self.session_alive() and not self.reused()
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from jwtauth.views import SessionListView, SessionRevokeView
+
+urlpatterns = [
+    path("sessions/", SessionListView.as_view(), name="jwtauth-sessions"),
+    path("sessions/<int:pk>/", SessionRevokeView.as_view(), name="jwtauth-session-revoke"),
+]
@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+from jwtauth.settings import api_settings
+
+UserModel = get_user_model()
+
+CACHE_KEY_PREFIX = "jwtauth:user:"
+
+
+def get_user_queryset():
+    """
+    The queryset used to load token users, restricted according to the USER_QUERY_ONLY,
+    USER_SELECT_RELATED and USER_PREFETCH_RELATED settings.
+    """
+    queryset = UserModel._default_manager.all()
+
+    if api_settings.USER_QUERY_ONLY:
+        queryset = queryset.only(*api_settings.USER_QUERY_ONLY)
+
+    if api_settings.USER_SELECT_RELATED:
+        queryset = queryset.select_related(*api_settings.USER_SELECT_RELATED)
+
+    if api_settings.USER_PREFETCH_RELATED:
+        queryset = queryset.prefetch_related(*api_settings.USER_PREFETCH_RELATED)
+
+    return queryset
+
+
+def load_user(user_id, users: dict = None):
+    """
+    Returns the user with the given id, or None if no such user exists.
+
+    :param user_id: The id of the user, as found in the token.
+    :param users: Optional per-request memo (user id -> user), so that tokens carrying
+        the same user id do not load the user twice.
+    """
+    if users is not None and user_id in users:
+        return users[user_id]
+
+    user = get_cached_user(user_id)
+
+    if user is None:
+        try:
+            user = get_user_queryset().get(pk=user_id)
+
+        except (UserModel.DoesNotExist, UserModel.MultipleObjectsReturned):
+            user = None
+
+        else:
+            set_cached_user(user)
+
+    if users is not None:
+        users[user_id] = user
+
+    return user
+
+
+def load_users(user_ids) -> dict:
+    """Returns a dictionary (user id -> user) of the existing users among the given ids, in a single query."""
+    return get_user_queryset().in_bulk(set(user_ids))
+
+
+def load_user_annotated(user_id, annotations: dict, users: dict = None):
+    """
+    Like load_user, additionally evaluating the given annotations (e.g. Exists() subqueries)
+    against the user row, in a single query.
+
+    Returns the user and a dictionary with the values of the annotations,
+    or (None, None) if no such user exists.
+    """
+    if users is not None and user_id in users:
+        user = users[user_id]
+
+        if user is None:
+            # already known not to exist
+            return None, None
+
+    else:
+        user = get_cached_user(user_id)
+
+    if user is not None:
+        # the user is known already, only the annotations are needed
+        values = UserModel._default_manager.filter(pk=user_id).annotate(**annotations).values(*annotations).first()
+
+        if values is None:
+            # the user has been deleted in the meantime
+            user = None
+
+    else:
+        user = get_user_queryset().annotate(**annotations).filter(pk=user_id).first()
+
+        if user is not None:
+            values = {name: user.__dict__.pop(name) for name in annotations}
+            set_cached_user(user)
+
+    if users is not None:
+        users[user_id] = user
+
+    if user is None:
+        return None, None
+
+    return user, values
+
+
+def get_user_cache():
+    if api_settings.USER_CACHE_TIMEOUT is None:
+        return None
+
+    return caches[api_settings.USER_CACHE_ALIAS]
+
+
+def get_cached_user(user_id):
+    cache = get_user_cache()
+
+    if cache is None:
+        return None
+
+    return cache.get(f"{CACHE_KEY_PREFIX}{user_id}")
+
+
+def set_cached_user(user) -> None:
+    cache = get_user_cache()
+
+    if cache is not None:
+        cache.set(f"{CACHE_KEY_PREFIX}{user.pk}", user, api_settings.USER_CACHE_TIMEOUT.total_seconds())
+
+
+def invalidate_user(sender, instance, **kwargs) -> None:
+    """post_save/post_delete receiver evicting the user from the shared user cache."""
+    cache = get_user_cache()
+
+    if cache is not None:
+        cache.delete(f"{CACHE_KEY_PREFIX}{instance.pk}")
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+
+from jwtauth.models import ActiveToken, BlacklistedToken
+from jwtauth.revocation_snapshot import get_revocation_snapshot
+from jwtauth.settings import api_settings
+from jwtauth.signatures import EXP, IAT, decode_claims
+from jwtauth.tenants import get_tenant_config
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.users import load_users
+
+# verification statuses
+VALID = "valid"
+EXPIRED = "expired"
+INVALID = "invalid"  # malformed, forged, or missing required claims
+REVOKED = "revoked"  # blacklisted refresh token, or no active session
+UNKNOWN_USER = "unknown_user"
+
+# below this many tokens, signatures are checked in the calling thread: not worth starting a pool
+INLINE_BATCH_SIZE = 16
+
+
+class Verification:
+    """The outcome of the verification of a single token by verify_many."""
+
+    def __init__(self, encoding: str, status: str, claims: dict = None, user=None):
+        self.encoding = encoding
+        self.status = status
+        self.claims = claims
+        self.user = user
+
+    @property
+    def valid(self) -> bool:
+        return self.status == VALID
+
+    @property
+    def exp(self) -> int | None:
+        return self.claims[EXP] if self.claims else None
+
+    def __repr__(self) -> str:
+        return f"<Verification {self.status}>"
+
+
+def verify_many(encodings, token_class=AccessToken, executor=None, chunksize=64, tenant=None) -> list[Verification]:
+    """
+    Verify many tokens at once and return one Verification per encoding, in input order.
+
+    Duplicate encodings are verified once. Signatures are checked in a worker pool, then all users
+    are loaded with a single query and, for refresh tokens, sessions and revocations are checked
+    in bulk, like the middleware does (revocation snapshot, write-behind queue, rotation).
+
+    :param encodings: The encoded tokens.
+    :param token_class: AccessToken or RefreshToken.
+    :param executor: Optional concurrent.futures executor for the signature checks, e.g. a
+        ProcessPoolExecutor for large batches. A thread pool is used by default.
+    :param chunksize: Number of tokens sent to a worker at a time (process pools only).
+    :param tenant: The tenant the tokens were issued for (see the TENANTS setting), None for the
+        global signing configuration.
+    """
+    encodings = list(encodings)
+    unique = list(dict.fromkeys(encodings))
+
+    # the key and algorithm are passed along, workers do not need the Django settings
+    config = get_tenant_config(tenant)
+    decode = partial(decode_claims, key=config.verifying_key, algorithm=config.algorithm, tenant=tenant)
+
+    if executor is None and len(unique) <= INLINE_BATCH_SIZE:
+        decoded = list(map(decode, unique))
+    elif executor is None:
+        with ThreadPoolExecutor() as pool:
+            decoded = list(pool.map(decode, unique))
+    else:
+        decoded = list(executor.map(decode, unique, chunksize=chunksize))
+
+    claims = {encoding: data for encoding, data in zip(unique, decoded, strict=True) if data is not None}
+
+    user_ids = {e: token_class.lookup_claim(data, token_class.USER_ID_KEY) for e, data in claims.items()}
+    users = load_users(user_id for user_id in user_ids.values() if user_id is not None)
+
+    sessions = issubclass(token_class, RefreshToken)
+    token_strings, revoked, active = {}, set(), {}
+
+    if sessions:
+        token_strings = {e: token_class.lookup_claim(data, token_class.TOKEN_STRING_KEY) for e, data in claims.items()}
+        strings = [token_string for token_string in token_strings.values() if token_string is not None]
+
+        # revocations up to the watermark are found in the snapshot, only newer ones are queried
+        snapshot = get_revocation_snapshot()
+        revocations = BlacklistedToken.objects.filter(token_string__in=strings)
+
+        if snapshot is not None:
+            revocations = revocations.filter(id__gt=snapshot.watermark)
+            revoked = {token_string for token_string in strings if token_string in snapshot}
+
+        revoked.update(revocations.values_list("token_string", flat=True))
+
+        rows = ActiveToken.objects.filter(token_string__in=strings)
+        active = {row[0]: row[1:] for row in rows.values_list("token_string", "owner_id", "generation", "rotated_at")}
+
+    now = datetime.now(tz=timezone.utc).timestamp()
+    results = {}
+
+    for encoding in unique:
+        data = claims.get(encoding)
+
+        if data is None or user_ids[encoding] is None:
+            results[encoding] = Verification(encoding, INVALID)
+            continue
+
+        user = users.get(user_ids[encoding])
+
+        if user is None:
+            results[encoding] = Verification(encoding, UNKNOWN_USER, data)
+            continue
+
+        if sessions:
+            token_string = token_strings[encoding]
+
+            if token_string is None:
+                results[encoding] = Verification(encoding, INVALID, data)
+                continue
+
+            if token_string in revoked or not session_active(token_class, data, token_string, user, active):
+                results[encoding] = Verification(encoding, REVOKED, data, user)
+                continue
+
+        status = EXPIRED if now > data[EXP] else VALID
+        results[encoding] = Verification(encoding, status, data, user)
+
+    return [results[encoding] for encoding in encodings]
+
+
+def session_active(token_class, data: dict, token_string: str, user, active: dict) -> bool:
+    """Whether the session of the given refresh token claims goes on, given the active sessions found."""
+    if token_string not in active:
+        return token_class.session_pending(token_string, data[IAT])
+
+    owner_id, generation, rotated_at = active[token_string]
+
+    if owner_id != user.pk:
+        return False
+
+    if not api_settings.ROTATE_REFRESH_TOKENS:
+        return True
+
+    token_generation = token_class.lookup_claim(data, token_class.GENERATION_KEY) or 0
+    return not token_class.generation_reused(token_generation, generation, rotated_at)
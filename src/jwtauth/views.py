@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from jwtauth.sessions import MAX_PAGE_SIZE, PAGE_SIZE, list_sessions, revoke_session
+from jwtauth.settings import api_settings
+from jwtauth.tenants import resolve_tenant
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.verification import verify_many
+
+# maximum number of tokens introspected by a single POST request
+MAX_BATCH_SIZE = 1000
+
+TOKEN_TYPES = {"access": AccessToken, "refresh": RefreshToken}
+
+
+class SessionListView(APIView):
+    """
+    Lists the active sessions of the logged user, most recent first. Pass the "next" value of a
+    page as the "cursor" query parameter to get the following one.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE)
+            sessions, cursor = list_sessions(request.user, request.query_params.get("cursor"), max(limit, 1))
+
+        except ValueError as e:
+            raise ValidationError("Invalid cursor or limit.") from e
+
+        refresh_token = request.jwtauth.refresh_token
+        current = refresh_token.token_string if refresh_token else None
+
+        results = [
+            {
+                "id": session.id,
+                "exp": session.exp,
+                "last_seen": session.last_seen,
+                "current": session.token_string == current,
+            }
+            for session in sessions
+        ]
+
+        return Response({"results": results, "next": cursor})
+
+
+class SessionRevokeView(APIView):
+    """Revokes one of the sessions of the logged user."""
+
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, pk):
+        if not revoke_session(request.user, pk):
+            raise NotFound()
+
+        return Response(status=204)
+
+
+class IntrospectionView(APIView):
+    """
+    Token introspection, for services that cannot validate jwtauth tokens themselves.
+
+    GET ?token=<token> introspects a single token, POST {"tokens": [...]} up to MAX_BATCH_SIZE
+    tokens at once; add token_type=refresh (query parameter or body field) for refresh tokens.
+    Active tokens are described as {"active": true, "user_id": ..., "exp": ...}, the others
+    (invalid, expired, revoked or of an unknown user) as {"active": false}.
+
+    GET responses of active tokens can be cached for their remaining lifetime, at most
+    INTROSPECTION_MAX_AGE. The view is not routed by jwtauth.urls: only expose it to the services
+    that need it.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        token = request.query_params.get("token")
+
+        if not token:
+            raise ValidationError("Missing token.")
+
+        [result] = self.introspect(request, [token], request.query_params.get("token_type"))
+
+        response = Response(describe(result))
+        response["Cache-Control"] = cache_control(result)
+        return response
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        tokens = data.get("tokens")
+
+        if not isinstance(tokens, list) or not all(isinstance(token, str) for token in tokens):
+            raise ValidationError("Please provide a list of tokens.")
+
+        if len(tokens) > MAX_BATCH_SIZE:
+            raise ValidationError(f"At most {MAX_BATCH_SIZE} tokens can be introspected at once.")
+
+        results = self.introspect(request, tokens, data.get("token_type"))
+
+        response = Response({"results": [describe(result) for result in results]})
+        response["Cache-Control"] = "no-store"
+        return response
+
+    @staticmethod
+    def introspect(request, tokens, token_type):
+        token_class = TOKEN_TYPES.get(token_type or "access")
+
+        if token_class is None:
+            raise ValidationError("Invalid token type.")
+
+        return verify_many(tokens, token_class=token_class, tenant=resolve_tenant(request))
+
+
+def describe(result) -> dict:
+    if not result.valid:
+        return {"active": False}
+
+    return {"active": True, "user_id": result.user.pk, "exp": result.exp}
+
+
+def cache_control(result) -> str:
+    if not result.valid:
+        # e.g. a session still waiting to be written might be active in a moment
+        return "no-store"
+
+    remaining = result.exp - datetime.now(tz=timezone.utc).timestamp()
+    max_age = min(remaining, api_settings.INTROSPECTION_MAX_AGE.total_seconds())
+    return f"private, max-age={max(int(max_age), 0)}"
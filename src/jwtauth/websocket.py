@@ -0,0 +1,109 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http.cookie import parse_cookie
+
+from jwtauth.manager import AuthManager
+from jwtauth.settings import api_settings
+
+# close code sent when the session of an open connection expires or is revoked
+SESSION_ENDED_CLOSE_CODE = 4001
+
+
+class ScopeRequest:
+    """The subset of a Django request needed by AuthManager, built from an ASGI scope."""
+
+    def __init__(self, scope):
+        self.META = {}
+
+        for name, value in scope.get("headers", ()):
+            key = "HTTP_" + name.decode("latin1").upper().replace("-", "_")
+            self.META[key] = value.decode("latin1")
+
+        self.COOKIES = parse_cookie(self.META.get("HTTP_COOKIE", ""))
+
+
+def call_db(func, *args):
+    """Run func in the thread used for database access, like channels' database_sync_to_async."""
+
+    def inner():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=True)()
+
+
+class WebSocketAuthMiddleware:
+    """
+    ASGI middleware authenticating WebSocket connections (e.g. Django Channels consumers) from
+    the jwtauth cookies sent with the handshake.
+
+    The result is cached for the life of the connection in scope["user"] (and scope["jwtauth"]):
+    messages are not authenticated one by one. Instead, the session is checked again every
+    WEBSOCKET_RECHECK_INTERVAL by a timer, whether or not the client sends messages, and the
+    connection is closed (with code 4001) if it has expired or has been revoked. Other connection
+    types are passed through.
+
+        application = ProtocolTypeRouter({
+            "websocket": WebSocketAuthMiddleware(URLRouter(websocket_urlpatterns)),
+        })
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket":
+            return await self.inner(scope, receive, send)
+
+        # the handshake cannot set cookies: rotating the refresh token would make the client reuse
+        # the old generation on its next request
+        manager = await call_db(AuthManager, ScopeRequest(scope), False)
+
+        scope = dict(scope)
+        scope["jwtauth"] = manager
+        scope["user"] = manager.user if manager.is_authenticated else AnonymousUser()
+
+        if not manager.is_authenticated:
+            return await self.inner(scope, receive, send)
+
+        ended = asyncio.Event()
+
+        async def recheck():
+            while True:
+                await asyncio.sleep(api_settings.WEBSOCKET_RECHECK_INTERVAL.total_seconds())
+
+                if not await call_db(manager.revalidate):
+                    break
+
+            # the session is over: close the connection, the application learns it upon receiving
+            scope["user"] = AnonymousUser()
+            await send({"type": "websocket.close", "code": SESSION_ENDED_CLOSE_CODE})
+            ended.set()
+
+        async def receive_checked():
+            if not ended.is_set():
+                message = asyncio.ensure_future(receive())
+                end = asyncio.ensure_future(ended.wait())
+                await asyncio.wait((message, end), return_when=asyncio.FIRST_COMPLETED)
+                end.cancel()
+
+                if message.done():
+                    return message.result()
+
+                message.cancel()
+
+            return {"type": "websocket.disconnect", "code": SESSION_ENDED_CLOSE_CODE}
+
+        timer = asyncio.ensure_future(recheck())
+
+        try:
+            return await self.inner(scope, receive_checked, send)
+
+        finally:
+            timer.cancel()
@@ -0,0 +1,206 @@
+import atexit
+import logging
+import threading
+
+from django.db import IntegrityError, connections, transaction
+
+from jwtauth.models import ActiveToken
+from jwtauth.revocation import evict_sessions
+from jwtauth.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWriter:
+    """
+    Write-behind queue for session bookkeeping.
+
+    ActiveToken inserts and last-seen updates are coalesced in memory and written with
+    bulk_create/bulk_update once WRITE_BEHIND_BATCH_SIZE operations are pending or
+    WRITE_BEHIND_FLUSH_INTERVAL has elapsed, and once more when the process exits.
+    When WRITE_BEHIND is disabled (synchronous mode) every operation is written immediately.
+
+    Inserts enforce MAX_SESSIONS_PER_USER in the same transaction.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inserts = {}  # token_string -> unsaved ActiveToken
+        self.touches = {}  # token_string -> last seen timestamp
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    @property
+    def deferred(self) -> bool:
+        return api_settings.WRITE_BEHIND
+
+    def insert(self, token: ActiveToken) -> None:
+        if not self.deferred:
+            with transaction.atomic():
+                token.save()
+                self.enforce_session_limit({token.owner_id})
+            return
+
+        with self.lock:
+            self.inserts[token.token_string] = token
+
+        self.schedule()
+
+    def hold(self, token: ActiveToken) -> None:
+        """
+        Queue an insert without scheduling its write: the session is considered active (pending) by
+        this process until it is flushed or discarded. Used by the pytest plugin.
+        """
+        with self.lock:
+            self.inserts[token.token_string] = token
+
+    def touch(self, token_string: str, timestamp: int) -> None:
+        if not self.deferred:
+            ActiveToken.objects.filter(token_string=token_string).update(last_seen=timestamp)
+            return
+
+        with self.lock:
+            if token_string in self.inserts:
+                # not written yet, the insert will carry the timestamp
+                self.inserts[token_string].last_seen = timestamp
+            else:
+                self.touches[token_string] = timestamp
+
+        self.schedule()
+
+    def pending(self, token_string: str) -> bool:
+        """Whether an insert for the given token is queued but not written yet."""
+        with self.lock:
+            return token_string in self.inserts
+
+    def discard(self, token_string: str) -> None:
+        """Drop any queued operation for the given token, e.g. because it is being revoked."""
+        with self.lock:
+            self.inserts.pop(token_string, None)
+            self.touches.pop(token_string, None)
+
+    def discard_owners(self, owner_ids) -> list:
+        """Drop the queued inserts of the given users, returning them."""
+        with self.lock:
+            discarded = [token for token in self.inserts.values() if token.owner_id in owner_ids]
+
+            for token in discarded:
+                del self.inserts[token.token_string]
+
+        return discarded
+
+    def size(self) -> int:
+        return len(self.inserts) + len(self.touches)
+
+    def schedule(self) -> None:
+        interval = api_settings.WRITE_BEHIND_FLUSH_INTERVAL
+
+        if self.size() >= api_settings.WRITE_BEHIND_MAX_QUEUE_SIZE:
+            # the background thread is falling behind, the requests write the queue themselves
+            self.flush()
+            return
+
+        if not interval:
+            # no background thread, flush inline once the batch is full
+            if self.size() >= api_settings.WRITE_BEHIND_BATCH_SIZE:
+                self.flush()
+            return
+
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(target=self.run, name="jwtauth-writer", daemon=True)
+                    self.thread.start()
+
+        if self.size() >= api_settings.WRITE_BEHIND_BATCH_SIZE:
+            self.wakeup.set()
+
+    @staticmethod
+    def enforce_session_limit(owner_ids) -> None:
+        if api_settings.MAX_SESSIONS_PER_USER is not None:
+            evict_sessions(owner_ids, api_settings.MAX_SESSIONS_PER_USER)
+
+    def run(self) -> None:
+        while True:
+            self.wakeup.wait(api_settings.WRITE_BEHIND_FLUSH_INTERVAL.total_seconds())
+            self.wakeup.clear()
+
+            try:
+                self.flush()
+            finally:
+                # this thread must not keep database connections open between flushes
+                connections.close_all()
+
+    def flush(self) -> None:
+        with self.lock:
+            inserts, self.inserts = self.inserts, {}
+            touches, self.touches = self.touches, {}
+
+        if not inserts and not touches:
+            return
+
+        try:
+            with transaction.atomic():
+                if inserts:
+                    self.write_inserts(inserts)
+
+                if touches:
+                    self.write_touches(touches)
+
+        except Exception:
+            logger.exception("jwtauth: could not flush %d session writes", len(inserts) + len(touches))
+
+            # a single bad row must not hold back the others: retry them one by one
+            self.requeue(self.write_each(inserts))
+
+    def write_inserts(self, inserts: dict) -> None:
+        ActiveToken.objects.bulk_create(inserts.values(), batch_size=api_settings.WRITE_BEHIND_BATCH_SIZE)
+        self.enforce_session_limit({token.owner_id for token in inserts.values()})
+
+    def write_touches(self, touches: dict) -> None:
+        rows = list(ActiveToken.objects.filter(token_string__in=touches).only("id", "token_string"))
+
+        for row in rows:
+            row.last_seen = touches[row.token_string]
+
+        ActiveToken.objects.bulk_update(rows, ["last_seen"], batch_size=api_settings.WRITE_BEHIND_BATCH_SIZE)
+
+    def write_each(self, inserts: dict) -> dict:
+        """Write the given inserts one at a time, returning the ones to retry later."""
+        failed = {}
+
+        for token_string, token in inserts.items():
+            try:
+                with transaction.atomic():
+                    self.write_inserts({token_string: token})
+
+            except IntegrityError:
+                # duplicate token string or deleted owner, retrying would fail again
+                logger.warning("jwtauth: dropping session write %s", token_string, exc_info=True)
+
+            except Exception:
+                failed[token_string] = token
+
+        return failed
+
+    def requeue(self, inserts: dict) -> None:
+        """Put back inserts that could not be written, dropping the oldest beyond WRITE_BEHIND_MAX_QUEUE_SIZE."""
+        if not inserts:
+            return
+
+        with self.lock:
+            # sessions must not be lost, the inserts are retried (last-seen updates are best effort)
+            queue = {**inserts, **self.inserts}
+            excess = len(queue) - api_settings.WRITE_BEHIND_MAX_QUEUE_SIZE
+
+            if excess > 0:
+                logger.error("jwtauth: session write queue full, dropping %d sessions", excess)
+                queue = dict(list(queue.items())[excess:])
+
+            self.inserts = queue
+
+
+session_writer = SessionWriter()
+
+# flush whatever is still pending when the process shuts down
+atexit.register(session_writer.flush)
@@ -2,6 +2,8 @@ import django
 import pytest
 from django.conf import settings
 
+pytest_plugins = ["jwtauth.pytest_plugin"]
+
 
 def pytest_configure():
     settings.configure(
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.admin.sites import site
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import RequestFactory
+
+from jwtauth.admin import EstimatedCountPaginator, ExpiryFilter
+from jwtauth.models import ActiveToken, BlacklistedToken
+from jwtauth.revocation import revoke_sessions
+from jwtauth.tokens import RefreshToken
+
+
+@pytest.fixture
+def user_b():
+    from django.contrib.auth.models import User
+
+    return User.objects.create_user("paul", "mccartney@thebeatles.com", "abc12345#")
+
+
+@pytest.fixture
+def sessions(user_a, user_b):
+    tokens = [RefreshToken(from_user=user) for user in (user_a, user_a, user_b)]
+    tokens.append(RefreshToken(from_user=user_b, duration=timedelta(0)))  # expired
+
+    for token in tokens:
+        token.save()
+
+    return tokens
+
+
+@pytest.fixture
+def admin_request():
+    request = RequestFactory().post("/")
+    request._messages = CookieStorage(request)
+    return request
+
+
+@pytest.mark.django_db
+def test_revoke_sessions(sessions, django_assert_max_num_queries):
+    with django_assert_max_num_queries(6):  # savepoints included
+        assert revoke_sessions(ActiveToken.objects.all()) == len(sessions)
+
+    assert ActiveToken.objects.count() == 0
+
+    # expired tokens are not blacklisted
+    assert BlacklistedToken.objects.count() == len(sessions) - 1
+    assert all(RefreshToken(from_encoding=token.encoding).blacklisted() for token in sessions[:-1])
+
+
+@pytest.mark.django_db
+def test_admin_revoke_selected(sessions, admin_request):
+    model_admin = site._registry[ActiveToken]
+    model_admin.revoke_selected(admin_request, ActiveToken.objects.filter(token_string=sessions[0].token_string))
+
+    assert not ActiveToken.objects.filter(token_string=sessions[0].token_string).exists()
+    assert ActiveToken.objects.count() == len(sessions) - 1
+
+
+@pytest.mark.django_db
+def test_admin_revoke_all_for_user(sessions, user_a, user_b, admin_request):
+    model_admin = site._registry[ActiveToken]
+    model_admin.revoke_all_for_user(admin_request, ActiveToken.objects.filter(token_string=sessions[0].token_string))
+
+    assert not ActiveToken.objects.filter(owner=user_a).exists()
+    assert ActiveToken.objects.filter(owner=user_b).count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(("bucket", "count"), [("expired", 1), ("hour", 0), ("day", 3), ("later", 0)])
+def test_expiry_filter(sessions, bucket, count):
+    expiry_filter = ExpiryFilter(None, {"expiry": [bucket]}, ActiveToken, site._registry[ActiveToken])
+    assert expiry_filter.queryset(None, ActiveToken.objects.all()).count() == count
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [ActiveToken, BlacklistedToken])
+def test_admin_search_uses_index(sessions, model):
+    revoke_sessions(ActiveToken.objects.filter(token_string=sessions[0].token_string))
+
+    # the first session is now blacklisted, the second one still active
+    token = sessions[0] if model is BlacklistedToken else sessions[1]
+
+    model_admin = site._registry[model]
+    queryset, _ = model_admin.get_search_results(None, model.objects.all(), token.token_string)
+
+    assert queryset.count() == 1
+    assert "SCAN" not in queryset.explain()
+
+
+@pytest.mark.django_db
+def test_blacklist_expiry_filter_uses_index(sessions):
+    revoke_sessions(ActiveToken.objects.all())
+
+    model_admin = site._registry[BlacklistedToken]
+    expiry_filter = ExpiryFilter(None, {"expiry": ["day"]}, BlacklistedToken, model_admin)
+    queryset = expiry_filter.queryset(None, BlacklistedToken.objects.all())
+
+    assert queryset.count() == 3
+    assert "bucket" in queryset.explain()
+
+
+@pytest.mark.django_db
+def test_paginator_counts_up_to_next_page(sessions, django_assert_num_queries):
+    queryset = ActiveToken.objects.filter(exp__gt=0).order_by("pk")
+
+    # a single query fetching one page and one row, no COUNT(*)
+    with django_assert_num_queries(1) as queries:
+        assert EstimatedCountPaginator(queryset, 2).count == 3
+
+    assert "COUNT" not in queries.captured_queries[0]["sql"]
+
+    assert EstimatedCountPaginator(queryset, 2, page_number=2).count == len(sessions)
+    assert EstimatedCountPaginator(queryset, 1).num_pages == 2
+
+    # past the last page
+    paginator = EstimatedCountPaginator(queryset, 2, page_number=5)
+    assert paginator.page(5).object_list.count() == 0
@@ -0,0 +1,91 @@
+import json
+from datetime import timedelta
+
+import jwt
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from jwtauth.audit import audit_tokens, unique_tokens
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.verification import EXPIRED, INVALID, REVOKED, UNKNOWN_USER, VALID
+
+
+@pytest.fixture
+def tokens(user_a):
+    user_b = User.objects.create_user("paul", "mccartney@thebeatles.com", "abc12345#")
+
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+
+    revoked = RefreshToken(from_user=user_a)
+    revoked.save()
+    revoked.blacklist()
+
+    deleted = AccessToken(from_user=user_b).encoding
+    user_b.delete()
+
+    return [
+        AccessToken(from_user=user_a).encoding,
+        AccessToken(from_user=user_a, duration=timedelta(0)).encoding,
+        jwt.encode({"user_id": user_a.id, "iat": 0, "exp": 2**40}, "new_key", algorithm="HS256"),
+        refresh.encoding,
+        revoked.encoding,
+        deleted,
+    ]
+
+
+STATUSES = [VALID, EXPIRED, INVALID, VALID, REVOKED, UNKNOWN_USER]
+
+
+def log_lines(tokens):
+    """Tokens as found in an access log, each of them twice."""
+    for token in tokens * 2:
+        yield f'127.0.0.1 - - "GET /logged/ HTTP/1.1" 204 "Cookie: access_token={token}; csrftoken=abc"\n'
+
+    yield '127.0.0.1 - - "GET /static/app.js HTTP/1.1" 200\n'
+
+
+@pytest.mark.django_db
+def test_audit_tokens(tokens, django_assert_max_num_queries):
+    # a few queries per chunk: users, then blacklist and sessions for refresh tokens
+    with django_assert_max_num_queries(3 * 4):
+        results = list(audit_tokens(log_lines(tokens), chunk_size=2))
+
+    assert [result.encoding for result in results] == tokens
+    assert [result.status for result in results] == STATUSES
+
+
+def test_unique_tokens_bounded():
+    assert list(unique_tokens(["a", "b", "a", "c", "a"], size=2)) == ["a", "b", "c"]
+
+    # "a" is forgotten once two other tokens were seen since
+    assert list(unique_tokens(["a", "b", "c", "a"], size=2)) == ["a", "b", "c", "a"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("workers", [0, 2])
+def test_audit_command(tokens, tmp_path, capsys, workers):
+    log = tmp_path / "access.log"
+    log.write_text("".join(log_lines(tokens)))
+    output = tmp_path / "audit.jsonl"
+
+    call_command("jwtauth_audit", str(log), "--output", str(output), "--format", "jsonl", "--workers", str(workers))
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [result["token"] for result in results] == tokens
+    assert [result["status"] for result in results] == STATUSES
+
+    assert "Audited 6 tokens: 1 expired, 1 invalid, 1 revoked, 1 unknown_user, 2 valid" in capsys.readouterr().err
+
+
+@pytest.mark.django_db
+def test_audit_command_tsv(user_a, tokens, tmp_path, capsys):
+    log = tmp_path / "access.log"
+    log.write_text("".join(log_lines(tokens)))
+
+    call_command("jwtauth_audit", str(log), "--workers", "0", "--token-type", "access")
+
+    first, *_ = capsys.readouterr().out.splitlines()
+    status, user_id, _, token = first.split("\t")
+    assert (status, user_id, token) == (VALID, str(user_a.pk), tokens[0])
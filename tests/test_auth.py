@@ -4,6 +4,7 @@ import pytest
 from django.urls import reverse
 from rest_framework import status
 
+from jwtauth.manager import AuthManager
 from jwtauth.models import ActiveToken, BlacklistedToken
 from jwtauth.settings import api_settings
 from jwtauth.tokens import AccessToken, RefreshToken
@@ -77,7 +78,7 @@ def test_forged_tokens(client, view):
         "hZvbkNsyrScDvwLSDKKezD7IJeFU"
     )
     response = client.get(reverse(view))
-    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
 @pytest.mark.django_db
@@ -85,7 +86,7 @@ def test_forged_tokens(client, view):
 def test_expired_tokens(expired_client, user_a, view):
     # verify the request to a logged view is forbidden (tokens are expired)
     response = expired_client.get(reverse(view))
-    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
 @pytest.mark.django_db
@@ -113,7 +114,7 @@ def test_username_not_logged(client):
 @pytest.mark.parametrize("view", ["logged1", "logged2"])
 def test_forbidden_view(client, view):
     response = client.get(reverse(view))
-    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
 
 @pytest.mark.django_db
@@ -130,3 +131,55 @@ def test_logout(logged_client):
 
     # verify the refresh token has been blacklisted
     assert BlacklistedToken.objects.count() == 1
+
+
+def bearer(token):
+    return {"HTTP_AUTHORIZATION": f"Bearer {token.encoding}"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view", ["logged1", "logged2"])
+def test_bearer_token(client, user_a, view, django_assert_num_queries):
+    # a single user query: no refresh token and no blacklist
+    with django_assert_num_queries(1):
+        response = client.get(reverse(view), **bearer(AccessToken(from_user=user_a)))
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert len(response.cookies) == 0
+
+
+@pytest.mark.django_db
+def test_bearer_token_username(client, user_a):
+    response = client.get(reverse("username"), **bearer(AccessToken(from_user=user_a)))
+    assert response.data["username"] == user_a.username
+
+
+@pytest.mark.django_db
+def test_bearer_token_expired(client, user_a):
+    response = client.get(reverse("logged1"), **bearer(AccessToken(from_user=user_a, duration=timedelta(0))))
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response["WWW-Authenticate"] == 'Bearer realm="api"'
+    assert len(response.cookies) == 0
+
+
+@pytest.mark.django_db
+def test_bearer_token_forged(client, user_a):
+    response = client.get(reverse("logged1"), HTTP_AUTHORIZATION="Bearer 12345")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_bearer_token_ignores_cookies(expired_client):
+    # the header takes precedence over the cookies: no silent refresh
+    response = expired_client.get(reverse("logged1"), HTTP_AUTHORIZATION="Bearer 12345")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert len(response.cookies) == 0
+
+
+@pytest.mark.django_db
+def test_bearer_revalidate(rf, user_a):
+    manager = AuthManager(rf.get("/", **bearer(AccessToken(from_user=user_a))))
+    assert manager.revalidate()
+
+    manager = AuthManager(rf.get("/", **bearer(AccessToken(from_user=user_a, duration=timedelta(0)))))
+    assert not manager.revalidate()
@@ -0,0 +1,221 @@
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.breaker import CLOSED, OPEN, ModelSnapshot, db_breaker
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+
+BREAKER = {
+    "DB_BREAKER": True,
+    "DB_BREAKER_FAILURE_THRESHOLD": 2,
+    "DB_QUERY_TIMEOUT": timedelta(milliseconds=50),
+}
+
+
+@contextmanager
+def slow_database(delay):
+    """Stand-in for a struggling database: every query takes `delay` seconds longer."""
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+@contextmanager
+def database_down():
+    def wrapper(execute, sql, params, many, context):
+        raise OperationalError("connection refused")
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+@pytest.fixture
+def breaker():
+    db_breaker.reset()
+
+    with override_settings(JWTAUTH=BREAKER):
+        yield db_breaker
+
+    db_breaker.reset()
+
+
+@pytest.fixture
+def session(user_a):
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    return AccessToken(from_user=user_a), refresh
+
+
+@pytest.mark.django_db
+def test_breaker_opens_on_slow_queries(user_a, breaker, django_assert_num_queries):
+    access = AccessToken(from_user=user_a)
+
+    with slow_database(0.1):
+        for _ in range(2):
+            # slow lookups still succeed
+            assert AccessToken(from_encoding=access.encoding).user == user_a
+
+    assert breaker.state == OPEN
+
+    # the database is not queried anymore, the last known user is served
+    with django_assert_num_queries(0):
+        assert AccessToken(from_encoding=access.encoding).user == user_a
+
+    metrics = breaker.metrics()
+    assert metrics["trips"] == 1
+    assert metrics["degraded_calls"] == 1
+    assert metrics["degraded_seconds"] > 0
+
+
+@pytest.mark.django_db
+def test_degraded_session_state(session, breaker):
+    access, refresh = session
+    assert RefreshToken(from_encoding=refresh.encoding).valid()
+
+    with database_down():
+        for _ in range(3):
+            assert RefreshToken(from_encoding=refresh.encoding).valid()
+
+        assert breaker.state == OPEN
+
+        with override_settings(JWTAUTH={**BREAKER, "DEGRADED_STALENESS": timedelta(0)}):
+            # the last known state is too old
+            assert not RefreshToken(from_encoding=refresh.encoding).valid()
+
+
+@pytest.mark.django_db
+def test_degraded_unknown_session(session, breaker):
+    access, refresh = session
+    breaker.trip()
+
+    # never seen, thus not trusted
+    assert not RefreshToken(from_encoding=refresh.encoding).valid()
+
+
+@pytest.mark.django_db
+def test_breaker_recovery(user_a, breaker):
+    access = AccessToken(from_user=user_a)
+    breaker.trip()
+
+    with override_settings(JWTAUTH={**BREAKER, "DB_BREAKER_RESET_TIMEOUT": timedelta(0)}):
+        # the trial lookup succeeds and closes the breaker
+        assert AccessToken(from_encoding=access.encoding).user == user_a
+
+    assert breaker.state == CLOSED
+    assert breaker.metrics()["degraded_calls"] == 0
+
+
+@pytest.mark.django_db
+def test_breaker_disabled(user_a):
+    access = AccessToken(from_user=user_a)
+
+    with database_down(), pytest.raises(OperationalError):
+        AccessToken(from_encoding=access.encoding)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("fail_closed", [True, False])
+def test_degraded_silent_refresh(client, user_a, breaker, fail_closed):
+    access = AccessToken(from_user=user_a, duration=timedelta(0))
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = access.encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+
+    # the session is known, then the database goes away
+    assert RefreshToken(from_encoding=refresh.encoding).valid()
+    breaker.trip()
+
+    policy = ("login", "refresh") if fail_closed else ()
+
+    with override_settings(JWTAUTH={**BREAKER, "DEGRADED_FAIL_CLOSED": policy}):
+        response = client.get(reverse("logged1"))
+
+    if fail_closed:
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    else:
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert api_settings.ACCESS_TOKEN_COOKIE_NAME in response.cookies
+
+
+@pytest.mark.django_db
+def test_degraded_login(client, user_a, user_a_password, breaker):
+    breaker.trip()
+
+    response = client.post(
+        reverse("login"),
+        {"username": user_a.username, "password": user_a_password},
+        content_type="application/json",
+    )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert len(response.cookies) == 0
+
+
+@pytest.mark.django_db
+def test_degraded_users_not_shared(user_a, breaker):
+    access = AccessToken(from_user=user_a)
+    loaded = AccessToken(from_encoding=access.encoding).user
+    loaded.jwtauth_request_state = "first request"
+    breaker.trip()
+
+    # every request gets its own instance of the last known user
+    first = AccessToken(from_encoding=access.encoding).user
+    second = AccessToken(from_encoding=access.encoding).user
+    assert first == second == user_a
+    assert first is not second
+    assert not hasattr(first, "jwtauth_request_state")
+
+
+@pytest.mark.django_db
+def test_last_known_state_snapshots(user_a, breaker):
+    access = AccessToken(from_user=user_a)
+
+    with override_settings(JWTAUTH={**BREAKER, "USER_QUERY_ONLY": ("id", "username")}):
+        AccessToken(from_encoding=access.encoding)
+
+    # the field values are stored, not the user instance
+    stored, _ = breaker.last_known.entries[("user", user_a.pk)]
+    assert isinstance(stored, ModelSnapshot)
+    assert stored.field_names == ["id", "username"]
+
+    breaker.trip()
+    user = AccessToken(from_encoding=access.encoding).user
+    assert user == user_a
+    assert user.username == user_a.username
+    assert user.get_deferred_fields() == {field.attname for field in User._meta.concrete_fields} - {"id", "username"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("track_last_seen", [True, False])
+def test_degraded_writes_skipped(client, session, breaker, track_last_seen):
+    access, refresh = session
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = access.encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+
+    settings = {**BREAKER, "TRACK_LAST_SEEN": track_last_seen, "WRITE_BEHIND": False}
+
+    with override_settings(JWTAUTH=settings):
+        assert client.get(reverse("logged1")).status_code == status.HTTP_204_NO_CONTENT
+        breaker.trip()
+
+        with database_down():
+            # neither the last seen timestamp nor the blacklist can be written
+            assert client.get(reverse("logged1")).status_code == status.HTTP_204_NO_CONTENT
+
+            response = client.delete(reverse("logout"))
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME].value == ""
@@ -0,0 +1,77 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+
+from jwtauth.health import token_health
+from jwtauth.tokens import RefreshToken
+
+
+@pytest.fixture
+def sessions(user_a):
+    heavy = User.objects.create_user("paul", "mccartney@thebeatles.com", "abc12345#")
+
+    for user, count in [(user_a, 2), (heavy, 5)]:
+        for _ in range(count):
+            RefreshToken(from_user=user).save()
+
+    RefreshToken(from_user=user_a, duration=timedelta(seconds=-1)).save()
+
+    expired = RefreshToken(from_user=user_a, duration=timedelta(seconds=-1))
+    expired.save()
+    expired.blacklist()
+
+    revoked = RefreshToken(from_user=user_a)
+    revoked.save()
+    revoked.blacklist()
+
+    return heavy
+
+
+@pytest.mark.django_db
+def test_token_health(sessions, django_assert_max_num_queries):
+    with django_assert_max_num_queries(10):
+        report = token_health(threshold=3)
+
+    assert report["active_tokens"] == {"rows": 8, "expired": 1, "expired_share": 0.125, "estimated": False}
+
+    blacklisted = report["blacklisted_tokens"]
+    assert (blacklisted["rows"], blacklisted["expired"], blacklisted["expired_share"]) == (2, 1, 0.5)
+
+    per_user = report["sessions_per_user"]
+    assert (per_user["users"], per_user["max"], per_user["mean"]) == (2, 5, 4.0)
+    assert per_user["abnormal"] == [{"user_id": sessions.pk, "sessions": 5}]
+
+    # not PostgreSQL
+    assert report["index_sizes"] is None
+
+    plans = report["plans"]
+    assert plans["active_lookup"]["index_only"]
+    assert plans["blacklist_lookup"]["index_only"]
+    assert "jwtauth_active_owner_exp" in plans["session_listing"]["plan"]
+    assert plans["refresh_validation"]["index_only"] is None
+
+
+@pytest.mark.django_db
+def test_health_threshold(sessions):
+    with override_settings(JWTAUTH={"MAX_SESSIONS_PER_USER": 10}):
+        assert token_health(plans=False)["sessions_per_user"]["abnormal"] == []
+
+
+@pytest.mark.django_db
+def test_health_command(sessions, capsys):
+    call_command("jwtauth_health", "--threshold", "3")
+    output = capsys.readouterr().out
+
+    assert "active_tokens: 8 rows, 1 expired (12.5%)" in output
+    assert f"user {sessions.pk}: 5 sessions (> 3)" in output
+    assert "blacklist_lookup (index-only: yes):" in output
+
+    call_command("jwtauth_health", "--json", "--no-plans")
+    report = json.loads(capsys.readouterr().out)
+
+    assert report["active_tokens"]["rows"] == 8
+    assert report["plans"] is None
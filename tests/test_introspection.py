@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.views import MAX_BATCH_SIZE
+
+
+def introspect(client, token, **params):
+    return client.get(reverse("introspect"), {"token": token, **params})
+
+
+def max_age(response) -> int:
+    directives = dict(directive.partition("=")[::2] for directive in response["Cache-Control"].split(", "))
+    return int(directives["max-age"])
+
+
+@pytest.mark.django_db
+def test_introspect_access_token(client, user_a):
+    token = AccessToken(from_user=user_a, duration=timedelta(seconds=10))
+
+    response = introspect(client, token.encoding)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"active": True, "user_id": user_a.pk, "exp": token.exp}
+
+    # bounded by the remaining lifetime
+    assert 0 < max_age(response) <= 10
+
+
+@pytest.mark.django_db
+def test_introspect_max_age(client, user_a):
+    token = AccessToken(from_user=user_a, duration=timedelta(hours=1))
+
+    # bounded by INTROSPECTION_MAX_AGE
+    assert max_age(introspect(client, token.encoding)) == 30
+
+
+@pytest.mark.django_db
+def test_introspect_inactive(client, user_a):
+    expired = AccessToken(from_user=user_a, duration=timedelta(0))
+
+    for token in [expired.encoding, "12345"]:
+        response = introspect(client, token)
+
+        assert response.json() == {"active": False}
+        assert response["Cache-Control"] == "no-store"
+
+
+@pytest.mark.django_db
+def test_introspect_refresh_token(client, user_a):
+    token = RefreshToken(from_user=user_a)
+    token.save()
+
+    assert introspect(client, token.encoding, token_type="refresh").json()["active"]
+
+    token.blacklist()
+    assert not introspect(client, token.encoding, token_type="refresh").json()["active"]
+
+
+@pytest.mark.django_db
+def test_introspect_batch(client, user_a, django_assert_num_queries):
+    active = RefreshToken(from_user=user_a)
+    active.save()
+    revoked = RefreshToken(from_user=user_a)
+    revoked.save()
+    revoked.blacklist()
+
+    body = {"tokens": [active.encoding, revoked.encoding, "12345"], "token_type": "refresh"}
+
+    # users, blacklist and sessions, whatever the number of tokens
+    with django_assert_num_queries(3):
+        response = client.post(reverse("introspect"), body, content_type="application/json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Cache-Control"] == "no-store"
+    assert response.json()["results"] == [
+        {"active": True, "user_id": user_a.pk, "exp": active.exp},
+        {"active": False},
+        {"active": False},
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"tokens": "12345"},
+        {"tokens": [1, 2]},
+        {"tokens": ["12345"] * (MAX_BATCH_SIZE + 1)},
+        {"tokens": ["12345"], "token_type": "id"},
+    ],
+)
+def test_introspect_batch_invalid(client, body):
+    response = client.post(reverse("introspect"), body, content_type="application/json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_introspect_missing_token(client):
+    assert client.get(reverse("introspect")).status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,46 @@
+import runpy
+from pathlib import Path
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+
+SAMPLE_SETTINGS = runpy.run_path(str(Path(__file__).parent / "sample_app" / "sample_app" / "settings.py"))
+
+
+@pytest.fixture
+def sample_middleware():
+    assert "django.contrib.sessions.middleware.SessionMiddleware" not in SAMPLE_SETTINGS["MIDDLEWARE"]
+    assert "django.contrib.auth.middleware.AuthenticationMiddleware" not in SAMPLE_SETTINGS["MIDDLEWARE"]
+
+    with override_settings(MIDDLEWARE=SAMPLE_SETTINGS["MIDDLEWARE"]):
+        yield
+
+
+@pytest.fixture
+def authenticated_client(client, user_a):
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = AccessToken(from_user=user_a).encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view", ["plain_username", "async_username"])
+def test_request_user(authenticated_client, user_a, sample_middleware, view, django_assert_num_queries):
+    # the tokens only: no session query
+    with django_assert_num_queries(1):
+        response = authenticated_client.get(reverse(view))
+
+    assert response.content.decode() == user_a.username
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("view", ["plain_username", "async_username"])
+def test_request_user_anonymous(client, sample_middleware, view):
+    response = client.get(reverse(view))
+    assert response.content.decode() == ""
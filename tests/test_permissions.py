@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import Group, Permission
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.permissions import get_snapshot, in_group
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+
+BACKENDS = ["jwtauth.backends.TokenPermissionBackend"]
+
+
+@pytest.fixture
+def permissions_claim():
+    with override_settings(JWTAUTH={"PERMISSIONS_CLAIM": True}, AUTHENTICATION_BACKENDS=BACKENDS):
+        yield
+
+
+@pytest.fixture
+def editor(user_a):
+    group = Group.objects.create(name="editors")
+    group.permissions.add(Permission.objects.get(codename="change_user"))
+    user_a.groups.add(group)
+    user_a.user_permissions.add(Permission.objects.get(codename="view_user"))
+    return user_a
+
+
+@pytest.mark.django_db
+def test_snapshot_claim(editor, permissions_claim):
+    token = AccessToken(from_user=editor)
+    assert token.data[AccessToken.PERMISSIONS_KEY] == {"g": ["editors"], "p": {"auth": ["change_user", "view_user"]}}
+
+
+@pytest.mark.django_db
+def test_snapshot_disabled(editor):
+    token = AccessToken(from_user=editor)
+    assert AccessToken.PERMISSIONS_KEY not in token.data
+
+
+@pytest.mark.django_db
+def test_query_free_permission_checks(editor, permissions_claim, django_assert_num_queries):
+    encoding = AccessToken(from_user=editor).encoding
+
+    # only the user query
+    with django_assert_num_queries(1):
+        user = AccessToken(from_encoding=encoding).user
+        assert user.has_perm("auth.change_user")
+        assert user.has_perm("auth.view_user")
+        assert not user.has_perm("auth.delete_user")
+        assert user.has_module_perms("auth")
+        assert in_group(user, "editors")
+
+
+@pytest.mark.django_db
+def test_snapshot_size_cap(editor):
+    with override_settings(
+        JWTAUTH={"PERMISSIONS_CLAIM": True, "PERMISSIONS_CLAIM_MAX_SIZE": 10},
+        AUTHENTICATION_BACKENDS=BACKENDS,
+    ):
+        token = AccessToken(from_user=editor)
+        assert AccessToken.PERMISSIONS_KEY not in token.data
+
+        # the permissions are read from the database instead
+        user = AccessToken(from_encoding=token.encoding).user
+        assert get_snapshot(user) is None
+        assert user.has_perm("auth.change_user")
+        assert in_group(user, "editors")
+
+
+@pytest.mark.django_db
+def test_snapshot_refreshed(editor, permissions_claim):
+    refresh = RefreshToken(from_user=editor)
+    editor.user_permissions.clear()
+
+    # newly minted access tokens carry the current permissions
+    user = refresh.gen_access_token().user
+    assert not user.has_perm("auth.view_user")
+    assert user.has_perm("auth.change_user")
+
+
+@pytest.mark.django_db
+def test_silent_refresh_snapshot_once(client, editor, permissions_claim, django_assert_num_queries):
+    refresh = RefreshToken(from_user=editor)
+    refresh.save()
+    expired = AccessToken(from_user=editor, duration=timedelta(0))
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = expired.encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+
+    # user and session, then the groups and permissions of the single access token minted
+    with django_assert_num_queries(3):
+        response = client.get(reverse("logged1"))
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    access = AccessToken(from_encoding=response.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME].value)
+    assert access.data[AccessToken.PERMISSIONS_KEY] == {"g": ["editors"], "p": {"auth": ["change_user", "view_user"]}}
@@ -0,0 +1,42 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.models import ActiveToken
+from jwtauth.settings import api_settings
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_jwtauth_login(client, user_a, jwtauth_login, in_memory):
+    jwtauth_login(client, user_a, in_memory=in_memory)
+
+    response = client.get(reverse("username"))
+    assert response.data["username"] == user_a.username
+    assert ActiveToken.objects.count() == (0 if in_memory else 1)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_jwtauth_expire_access(client, user_a, jwtauth_login, in_memory):
+    session = jwtauth_login(client, user_a, in_memory=in_memory)
+    session.expire_access()
+
+    # silently refreshed
+    response = client.get(reverse("logged1"))
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert api_settings.ACCESS_TOKEN_COOKIE_NAME in response.cookies
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_jwtauth_expire(client, user_a, jwtauth_login, in_memory):
+    jwtauth_login(client, user_a, in_memory=in_memory).expire()
+    assert client.get(reverse("logged1")).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_jwtauth_revoke(client, user_a, jwtauth_login, in_memory):
+    jwtauth_login(client, user_a, in_memory=in_memory).revoke()
+    assert client.get(reverse("logged1")).status_code == status.HTTP_401_UNAUTHORIZED
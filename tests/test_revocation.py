@@ -0,0 +1,74 @@
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.test import override_settings
+
+from jwtauth.models import BlacklistedToken, expiry_bucket
+from jwtauth.revocation import retire_expired_buckets
+from jwtauth.tokens import RefreshToken
+
+DAY = 24 * 60 * 60
+
+
+def now() -> int:
+    return timegm(datetime.now(tz=timezone.utc).utctimetuple())
+
+
+@pytest.mark.django_db
+def test_revocation_bucket(user_a):
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    token.blacklist()
+
+    revocation = BlacklistedToken.objects.get(token_string=token.token_string)
+    assert revocation.bucket == expiry_bucket(token.exp)
+    assert revocation.bucket % DAY == 0
+    assert token.exp < revocation.bucket <= token.exp + DAY
+
+
+@pytest.mark.django_db
+def test_revocation_bucket_size():
+    with override_settings(JWTAUTH={"REVOCATION_BUCKET_SIZE": timedelta(hours=1)}):
+        assert expiry_bucket(3600) == 7200
+        assert expiry_bucket(3601) == 7200
+        assert expiry_bucket(7199) == 7200
+
+
+@pytest.mark.django_db
+def test_retire_expired_buckets(django_assert_num_queries):
+    today = now() - now() % DAY
+
+    for i, exp in enumerate([today - 2 * DAY, today - 1, today, now() - 1, now() + DAY]):
+        BlacklistedToken.objects.create(token_string=f"token{i}", exp=exp)
+
+    with django_assert_num_queries(1):
+        assert retire_expired_buckets() == 2
+
+    # the bucket of today has not ended yet, even if some of its tokens are expired
+    assert set(BlacklistedToken.objects.values_list("token_string", flat=True)) == {"token2", "token3", "token4"}
+
+
+@pytest.mark.django_db
+def test_retire_command(capsys):
+    BlacklistedToken.objects.create(token_string="expired", exp=now() - 2 * DAY)
+
+    call_command("jwtauth_retire_revocations")
+
+    assert "Retired 1 expired revocations" in capsys.readouterr().out
+    assert not BlacklistedToken.objects.exists()
+
+
+@pytest.mark.django_db
+def test_fill_buckets_migration():
+    migration = import_module("jwtauth.migrations.0004_blacklistedtoken_bucket")
+    BlacklistedToken.objects.create(token_string="token", exp=now())
+    BlacklistedToken.objects.update(bucket=0)
+
+    migration.fill_buckets(apps, None)
+
+    revocation = BlacklistedToken.objects.get()
+    assert revocation.bucket == expiry_bucket(revocation.exp)
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+
+from jwtauth.models import BlacklistedToken
+from jwtauth.revocation_snapshot import RevocationSnapshot, get_revocation_snapshot, write_revocation_snapshot
+from jwtauth.tokens import RefreshToken
+
+# no overlap below the highest id: the tests control which revocations are in flight
+SNAPSHOT = {"REVOCATION_SNAPSHOT_CHECK_INTERVAL": timedelta(0), "REVOCATION_SNAPSHOT_OVERLAP": 0}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / "revocations")
+
+    with override_settings(JWTAUTH={**SNAPSHOT, "REVOCATION_SNAPSHOT_PATH": path}):
+        yield path
+
+
+def session(user):
+    token = RefreshToken(from_user=user)
+    token.save()
+    return token
+
+
+@pytest.mark.django_db
+def test_write_snapshot(user_a, tmp_path):
+    revoked = [session(user_a) for _ in range(3)]
+
+    for token in revoked:
+        token.blacklist()
+
+    BlacklistedToken.objects.create(token_string="expired", exp=0)
+    path = str(tmp_path / "revocations")
+
+    with override_settings(JWTAUTH=SNAPSHOT):
+        assert write_revocation_snapshot(path) == (3, BlacklistedToken.objects.latest("id").id)
+
+    snapshot = RevocationSnapshot(path)
+    assert len(snapshot) == 3
+    assert list(snapshot) == sorted(snapshot)
+    assert all(token.token_string in snapshot for token in revoked)
+    assert "expired" not in snapshot
+    assert session(user_a).token_string not in snapshot
+
+
+@pytest.mark.django_db
+def test_snapshot_lookup(user_a, snapshot_path):
+    token = session(user_a)
+    token.blacklist()
+    write_revocation_snapshot(snapshot_path)
+
+    # the database row is not queried anymore, the snapshot is enough
+    BlacklistedToken.objects.all().delete()
+    decoded = RefreshToken(from_encoding=token.encoding)
+    assert decoded.blacklisted()
+    assert not decoded.valid()
+
+
+@pytest.mark.django_db
+def test_revoked_after_snapshot(user_a, snapshot_path):
+    token = session(user_a)
+    write_revocation_snapshot(snapshot_path)
+
+    # above the watermark, found in the database
+    token.blacklist()
+    assert RefreshToken(from_encoding=token.encoding).blacklisted()
+    assert not RefreshToken(from_encoding=session(user_a).encoding).blacklisted()
+
+
+@pytest.mark.django_db
+def test_snapshot_reloaded(user_a, snapshot_path):
+    assert get_revocation_snapshot() is None
+
+    write_revocation_snapshot(snapshot_path)
+    first = get_revocation_snapshot()
+    assert len(first) == 0
+
+    session(user_a).blacklist()
+    write_revocation_snapshot(snapshot_path)
+    second = get_revocation_snapshot()
+
+    assert len(second) == 1
+    assert second.watermark > first.watermark
+
+
+@pytest.mark.django_db
+def test_snapshot_command(user_a, snapshot_path):
+    session(user_a).blacklist()
+    call_command("jwtauth_revocation_snapshot")
+    assert len(RevocationSnapshot(snapshot_path)) == 1
+
+
+@pytest.mark.django_db
+def test_snapshot_watermark_overlap(user_a, tmp_path):
+    for _ in range(3):
+        session(user_a).blacklist()
+
+    path = str(tmp_path / "revocations")
+    highest = BlacklistedToken.objects.latest("id").id
+
+    with override_settings(JWTAUTH={**SNAPSHOT, "REVOCATION_SNAPSHOT_OVERLAP": 2}):
+        # revocations with lower ids may commit later, the last two ids are still queried
+        assert write_revocation_snapshot(path) == (3, highest - 2)
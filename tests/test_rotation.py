@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.models import ActiveToken, BlacklistedToken
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+
+ROTATION = {"ROTATE_REFRESH_TOKENS": True}
+
+
+@pytest.fixture
+def rotation():
+    with override_settings(JWTAUTH=ROTATION):
+        yield
+
+
+@pytest.fixture
+def session(user_a):
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    return refresh
+
+
+def request_with(client, refresh, user):
+    """Request with an expired access token, so that it is silently refreshed."""
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = AccessToken(from_user=user, duration=timedelta(0)).encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+    return client.get(reverse("logged1"))
+
+
+@pytest.mark.django_db
+def test_rotation(client, user_a, session, rotation):
+    with CaptureQueriesContext(connection) as queries:
+        response = request_with(client, session, user_a)
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    rotated = RefreshToken(from_encoding=response.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME].value)
+    assert rotated.valid()
+    assert rotated.token_string == session.token_string
+    assert rotated.generation == 1
+    assert rotated.exp == session.exp
+
+    # a single write, and no new rows
+    writes = [query for query in queries.captured_queries if not query["sql"].startswith("SELECT")]
+    assert len(writes) == 1
+    assert ActiveToken.objects.get().generation == 1
+    assert not BlacklistedToken.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rotation_disabled(client, user_a, session):
+    response = request_with(client, session, user_a)
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert api_settings.REFRESH_TOKEN_COOKIE_NAME not in response.cookies
+    assert ActiveToken.objects.get().generation == 0
+
+
+@pytest.mark.django_db
+def test_concurrent_rotation(session, rotation):
+    assert session.rotate().generation == 1
+
+    # the session is not at the generation of the token anymore
+    assert session.rotate() is None
+
+
+@pytest.mark.django_db
+def test_reuse_interval(client, user_a, session, rotation):
+    session.rotate()
+
+    # e.g. a request sent concurrently with the one that rotated the token
+    response = request_with(client, session, user_a)
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert api_settings.REFRESH_TOKEN_COOKIE_NAME not in response.cookies
+    assert ActiveToken.objects.get().generation == 1
+
+
+@pytest.mark.django_db
+def test_reuse_revokes_session(client, user_a, session):
+    with override_settings(JWTAUTH={**ROTATION, "REFRESH_REUSE_INTERVAL": timedelta(seconds=-1)}):
+        rotated = session.rotate()
+
+        response = request_with(client, session, user_a)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        # the latest generation is revoked as well
+        assert not ActiveToken.objects.exists()
+        assert BlacklistedToken.objects.filter(token_string=session.token_string).exists()
+        assert not RefreshToken(from_encoding=rotated.encoding).valid()
+
+
+@pytest.mark.django_db
+def test_reuse_older_generation(session, rotation):
+    session.rotate().rotate()
+
+    # more than one generation behind, whatever the interval
+    assert RefreshToken(from_encoding=session.encoding).reused()
@@ -0,0 +1,91 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.models import ActiveToken
+from jwtauth.sessions import list_sessions
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+
+
+@pytest.fixture
+def sessions(user_a):
+    tokens = [RefreshToken(from_user=user_a) for _ in range(5)]
+
+    for token in tokens:
+        token.save()
+
+    return tokens
+
+
+@pytest.fixture
+def session_client(client, user_a, sessions):
+    # logged in with the first session
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = AccessToken(from_user=user_a).encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = sessions[0].encoding
+    return client
+
+
+@pytest.mark.django_db
+def test_list_sessions_pages(user_a, sessions):
+    pages, cursor = [], None
+
+    while True:
+        page, cursor = list_sessions(user_a, cursor, limit=2)
+        pages.append(page)
+
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+    # most recent first, each session exactly once
+    listed = [session for page in pages for session in page]
+    assert listed == list(ActiveToken.objects.order_by("-exp", "-id"))
+
+
+@pytest.mark.django_db
+def test_list_sessions_view(session_client, sessions):
+    response = session_client.get(reverse("jwtauth-sessions"), {"limit": 3})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == 3
+
+    response = session_client.get(reverse("jwtauth-sessions"), {"cursor": response.data["next"]})
+    assert len(response.data["results"]) == 2
+    assert response.data["next"] is None
+
+    # the session of the request is flagged, token strings are not disclosed
+    current = ActiveToken.objects.get(token_string=sessions[0].token_string)
+    assert [session["id"] for session in response.data["results"] if session["current"]] == [current.id]
+    assert "token_string" not in response.data["results"][0]
+
+
+@pytest.mark.django_db
+def test_list_sessions_invalid_cursor(session_client):
+    response = session_client.get(reverse("jwtauth-sessions"), {"cursor": "abc"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_revoke_session_view(session_client, sessions):
+    session = ActiveToken.objects.get(token_string=sessions[1].token_string)
+
+    response = session_client.delete(reverse("jwtauth-session-revoke", args=[session.id]))
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert not ActiveToken.objects.filter(id=session.id).exists()
+    assert RefreshToken(from_encoding=sessions[1].encoding).blacklisted()
+
+    response = session_client.delete(reverse("jwtauth-session-revoke", args=[session.id]))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_revoke_session_of_other_user(session_client):
+    from django.contrib.auth.models import User
+
+    other = RefreshToken(from_user=User.objects.create_user("paul", "mccartney@thebeatles.com", "abc12345#"))
+    session = other.save()
+
+    response = session_client.delete(reverse("jwtauth-session-revoke", args=[session.id]))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert ActiveToken.objects.filter(id=session.id).exists()
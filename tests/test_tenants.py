@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+import jwt
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.settings import api_settings
+from jwtauth.tenants import key_cache
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.verification import INVALID, VALID, verify_many
+
+ACME = "acme.example.com"
+GLOBEX = "globex.example.com"
+
+TENANTS = {
+    "TENANT_RESOLVER": "jwtauth.tenants.tenant_from_host",
+    "TENANTS": {
+        ACME: {"SIGNING_KEY": "acme-key", "ACCESS_TOKEN_LIFETIME": timedelta(minutes=1)},
+        GLOBEX: {"SIGNING_KEY": "globex-key", "ALGORITHM": "HS512"},
+    },
+}
+
+
+@pytest.fixture
+def tenants():
+    key_cache.clear()
+
+    with override_settings(JWTAUTH=TENANTS, ALLOWED_HOSTS=[ACME, GLOBEX, "testserver"]):
+        yield
+
+    key_cache.clear()
+
+
+@pytest.mark.django_db
+def test_tenant_token_isolation(user_a, tenants):
+    token = AccessToken(from_user=user_a, tenant=ACME)
+
+    assert AccessToken(from_encoding=token.encoding, tenant=ACME).valid()
+    assert not AccessToken(from_encoding=token.encoding, tenant=GLOBEX).valid()
+    assert not AccessToken(from_encoding=token.encoding).valid()
+
+    # global tokens are not accepted by tenants either
+    token = AccessToken(from_user=user_a)
+    assert not AccessToken(from_encoding=token.encoding, tenant=ACME).valid()
+
+
+@pytest.mark.django_db
+def test_tenant_shared_key(user_a, tenants):
+    shared = {ACME: {"SIGNING_KEY": "shared"}, GLOBEX: {"SIGNING_KEY": "shared"}}
+
+    with override_settings(JWTAUTH={**TENANTS, "TENANTS": shared}):
+        token = RefreshToken(from_user=user_a, tenant=ACME)
+        token.save()
+
+        # the tenant of the token is checked, not only its signature
+        assert RefreshToken(from_encoding=token.encoding, tenant=ACME).valid()
+        assert not RefreshToken(from_encoding=token.encoding, tenant=GLOBEX).valid()
+
+
+@pytest.mark.django_db
+def test_tenant_lifetimes(user_a, tenants):
+    acme = AccessToken(from_user=user_a, tenant=ACME)
+    globex = AccessToken(from_user=user_a, tenant=GLOBEX)
+
+    assert acme.exp - acme.iat == 60
+    assert globex.exp - globex.iat == api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+
+
+@pytest.mark.django_db
+def test_unknown_tenant(user_a, tenants):
+    with pytest.raises(Exception, match="Unknown tenant"):
+        AccessToken(from_user=user_a, tenant="initech.example.com")
+
+
+@pytest.mark.django_db
+def test_tenant_from_host(client, user_a, user_a_password, tenants):
+    response = client.post(
+        reverse("login"),
+        {"username": user_a.username, "password": user_a_password},
+        content_type="application/json",
+        HTTP_HOST=ACME,
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    client.cookies = response.cookies
+
+    assert client.get(reverse("logged1"), HTTP_HOST=ACME).status_code == status.HTTP_204_NO_CONTENT
+    assert client.get(reverse("logged1"), HTTP_HOST=GLOBEX).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get(reverse("logged1")).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_tenant_from_token(client, user_a, tenants):
+    token = AccessToken(from_user=user_a, tenant=GLOBEX)
+
+    with override_settings(JWTAUTH={**TENANTS, "TENANT_RESOLVER": "jwtauth.tenants.tenant_from_token"}):
+        response = client.get(reverse("logged1"), HTTP_AUTHORIZATION=f"Bearer {token.encoding}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        # a forged token naming the tenant is still verified with the key of the tenant
+        forged = jwt.encode(token.claims, "attacker-key", algorithm="HS512", headers={"kid": GLOBEX})
+        response = client.get(reverse("logged1"), HTTP_AUTHORIZATION=f"Bearer {forged}")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_key_cache_hit_rate(user_a, tenants):
+    for _ in range(50):
+        for tenant in (ACME, GLOBEX):
+            AccessToken(from_encoding=AccessToken(from_user=user_a, tenant=tenant).encoding, tenant=tenant)
+
+    # each key is prepared once
+    metrics = key_cache.metrics()
+    assert metrics["misses"] == 2
+    assert metrics["hits"] == 198
+    assert metrics["hit_rate"] == pytest.approx(0.99)
+
+
+@pytest.mark.django_db
+def test_key_cache_bounded(user_a, tenants):
+    with override_settings(JWTAUTH={**TENANTS, "TENANT_KEY_CACHE_SIZE": 1}):
+        for _ in range(5):
+            for tenant in (ACME, GLOBEX):
+                AccessToken(from_user=user_a, tenant=tenant)
+
+        # the least recently used key is dropped every time
+        metrics = key_cache.metrics()
+        assert metrics["size"] == 1
+        assert metrics["misses"] == 10
+
+
+@pytest.mark.django_db
+def test_verify_many_tenant(user_a, tenants):
+    acme = AccessToken(from_user=user_a, tenant=ACME).encoding
+    globex = AccessToken(from_user=user_a, tenant=GLOBEX).encoding
+
+    results = verify_many([acme, globex], tenant=ACME)
+    assert [result.status for result in results] == [VALID, INVALID]
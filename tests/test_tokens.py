@@ -2,7 +2,9 @@ from datetime import datetime, timedelta, timezone
 
 import jwt
 import pytest
+from django.test import override_settings
 
+from jwtauth.codec import JSONCodec, get_jwt, orjson
 from jwtauth.models import ActiveToken
 from jwtauth.settings import api_settings
 from jwtauth.tokens import AccessToken, RefreshToken, Token, UserToken
@@ -229,3 +231,112 @@ def test_gen_access_token(user_a):
     assert acc_token.valid()
     assert not acc_token.expired()
     assert acc_token.user == user_a
+
+
+@pytest.mark.django_db
+def test_compact_profile(user_a):
+    # tokens of the compact profile use short claim names, a shorter token string and no "typ" header
+    with override_settings(JWTAUTH={"TOKEN_PROFILE": "compact"}):
+        access = AccessToken(from_user=user_a)
+        refresh = RefreshToken(from_user=user_a)
+        refresh.save()
+
+        assert set(access.data) == {"u"}
+        assert set(refresh.data) == {"u", "t"}
+        assert len(refresh.token_string) == 22
+        assert "typ" not in jwt.get_unverified_header(access.encoding)
+
+        decoded = RefreshToken(from_encoding=refresh.encoding)
+        assert decoded.valid()
+        assert decoded.user == user_a
+        assert decoded.token_string == refresh.token_string
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(("issued", "accepted"), [("default", "compact"), ("compact", "default")])
+def test_profile_switch(user_a, issued, accepted):
+    # tokens issued with one profile are still accepted after switching to the other
+    with override_settings(JWTAUTH={"TOKEN_PROFILE": issued}):
+        access = AccessToken(from_user=user_a)
+        refresh = RefreshToken(from_user=user_a)
+        refresh.save()
+
+    with override_settings(JWTAUTH={"TOKEN_PROFILE": accepted}):
+        assert AccessToken(from_encoding=access.encoding).user == user_a
+
+        decoded = RefreshToken(from_encoding=refresh.encoding)
+        assert decoded.valid()
+        assert decoded.token_string == refresh.token_string
+
+
+CODECS = ["json", pytest.param("orjson", marks=pytest.mark.skipif(orjson is None, reason="orjson not installed"))]
+
+
+def test_json_codec_identical_to_pyjwt():
+    # the standard library codec produces exactly the tokens PyJWT produces
+    payload = {"user_id": 1, "perms": {"g": ["é"]}, "iat": 1, "exp": 2}
+    assert get_jwt("json").encode(payload, "key", algorithm="HS256") == jwt.encode(payload, "key", algorithm="HS256")
+    assert JSONCodec.loads(JSONCodec.dumps(payload)) == payload
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("encoder", CODECS)
+@pytest.mark.parametrize("decoder", CODECS)
+def test_json_codecs_interoperable(user_a, encoder, decoder):
+    # tokens encoded with one codec are accepted by the other
+    with override_settings(JWTAUTH={"JSON_CODEC": encoder}):
+        token = RefreshToken(from_user=user_a)
+        token.save()
+
+    with override_settings(JWTAUTH={"JSON_CODEC": decoder}):
+        decoded = RefreshToken(from_encoding=token.encoding)
+        assert decoded.valid()
+        assert decoded.jwt_data == token.jwt_data
+
+        # the signature is verified as usual
+        assert not Token(from_encoding=jwt.encode(token.jwt_data, "new_key", algorithm="HS256")).valid()
+
+
+@pytest.mark.django_db
+def test_refresh_token_inactive(user_a):
+    # a refresh token without an active session is rejected
+    token = RefreshToken(from_user=user_a)
+    decoded = RefreshToken(from_encoding=token.encoding)
+    assert not decoded.active
+    assert not decoded.valid()
+
+
+@pytest.mark.django_db
+def test_refresh_token_single_query(user_a, django_assert_num_queries):
+    # the user, the session and the blacklist are checked in a single query
+    token = RefreshToken(from_user=user_a)
+    token.save()
+
+    with django_assert_num_queries(1):
+        decoded = RefreshToken(from_encoding=token.encoding)
+        assert decoded.valid()
+        assert not decoded.blacklisted()
+        assert decoded.user == user_a
+
+
+@pytest.mark.django_db
+def test_refresh_token_single_query_revoked(user_a, django_assert_num_queries):
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    token.blacklist()
+
+    with django_assert_num_queries(1):
+        decoded = RefreshToken(from_encoding=token.encoding)
+        assert decoded.blacklisted()
+        assert not decoded.valid()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("token_class", [AccessToken, RefreshToken])
+def test_token_slots(user_a, token_class):
+    # tokens have no per-instance dictionary and keep the claims only once
+    token = token_class(from_encoding=token_class(from_user=user_a).encoding)
+    assert not hasattr(token, "__dict__")
+    assert token.jwt_data is token.claims
+    assert token.data == {k: v for k, v in token.claims.items() if k not in Token.registered_claims}
+    assert (token.iat, token.exp) == (token.claims["iat"], token.claims["exp"])
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.users import get_cached_user, load_user
+
+USER_CACHE = {"USER_CACHE_TIMEOUT": timedelta(seconds=30)}
+
+
+@pytest.fixture
+def user_cache():
+    with override_settings(JWTAUTH=USER_CACHE):
+        yield cache
+        cache.clear()
+
+
+@pytest.mark.django_db
+def test_shared_user_memo(user_a, django_assert_num_queries):
+    # an access and a refresh token of the same user only load the user once
+    access = AccessToken(from_user=user_a)
+    refresh = RefreshToken(from_user=user_a)
+    users = {}
+
+    with django_assert_num_queries(1):
+        decoded_refresh = RefreshToken(from_encoding=refresh.encoding, users=users)
+        decoded_access = AccessToken(from_encoding=access.encoding, users=users)
+        assert decoded_access.user is decoded_refresh.user
+
+
+@pytest.mark.django_db
+def test_logged_request_queries(client, user_a, django_assert_num_queries):
+    access = AccessToken(from_user=user_a)
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = access.encoding
+    client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+
+    # the user and the session are validated in a single query
+    with django_assert_num_queries(1):
+        response = client.get(reverse("logged1"))
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+def test_user_query_only(user_a):
+    with override_settings(JWTAUTH={"USER_QUERY_ONLY": ("id", "username")}):
+        user = load_user(user_a.id)
+
+    assert user.username == user_a.username
+    assert user.get_deferred_fields() >= {"email", "password"}
+
+
+@pytest.mark.django_db
+def test_missing_user():
+    assert load_user(1234) is None
+
+
+@pytest.mark.django_db
+def test_user_cache(user_a, user_cache, django_assert_num_queries):
+    load_user(user_a.id)
+    assert get_cached_user(user_a.id) == user_a
+
+    with django_assert_num_queries(0):
+        assert load_user(user_a.id) == user_a
+
+
+@pytest.mark.django_db
+def test_user_cache_invalidation(user_a, user_cache):
+    load_user(user_a.id)
+
+    user_a.username = "paul"
+    user_a.save()
+    assert get_cached_user(user_a.id) is None
+    assert load_user(user_a.id).username == "paul"
+
+    user_a.delete()
+    assert get_cached_user(user_a.id) is None
@@ -0,0 +1,101 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import jwt
+import pytest
+from django.test import override_settings
+
+from jwtauth.models import ActiveToken
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.verification import EXPIRED, INVALID, REVOKED, UNKNOWN_USER, VALID, verify_many
+from jwtauth.writer import session_writer
+
+
+@pytest.fixture
+def user_b():
+    from django.contrib.auth.models import User
+
+    return User.objects.create_user("paul", "mccartney@thebeatles.com", "abc12345#")
+
+
+@pytest.mark.django_db
+def test_verify_many_access(user_a, user_b, django_assert_num_queries):
+    valid_a = AccessToken(from_user=user_a).encoding
+    expired = AccessToken(from_user=user_a, duration=timedelta(0)).encoding
+    forged = jwt.encode({"user_id": user_a.id, "iat": 0, "exp": 2**40}, "new_key", algorithm="HS256")
+
+    deleted = AccessToken(from_user=user_b).encoding
+    user_b.delete()
+
+    encodings = [valid_a, forged, expired, valid_a, deleted, "12345"]
+
+    # all the users are loaded in a single query
+    with django_assert_num_queries(1):
+        results = verify_many(encodings)
+
+    assert [result.status for result in results] == [VALID, INVALID, EXPIRED, VALID, UNKNOWN_USER, INVALID]
+    assert [result.encoding for result in results] == encodings
+    assert results[0].user == user_a
+    assert results[0] is results[3]  # duplicates are verified once
+
+
+@pytest.mark.django_db
+def test_verify_many_refresh(user_a, django_assert_num_queries):
+    active = RefreshToken(from_user=user_a)
+    active.save()
+
+    revoked = RefreshToken(from_user=user_a)
+    revoked.save()
+    revoked.blacklist()
+
+    inactive = RefreshToken(from_user=user_a)
+    access = AccessToken(from_user=user_a)
+
+    encodings = [active.encoding, revoked.encoding, inactive.encoding, access.encoding]
+
+    # users, blacklist and sessions
+    with django_assert_num_queries(3):
+        results = verify_many(encodings, token_class=RefreshToken)
+
+    assert [result.status for result in results] == [VALID, REVOKED, REVOKED, INVALID]
+    assert results[0].exp == active.exp
+
+
+@pytest.mark.django_db
+def test_verify_many_process_pool(user_a):
+    encodings = [AccessToken(from_user=user_a).encoding for _ in range(10)]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        results = verify_many(encodings, executor=executor, chunksize=2)
+
+    assert all(result.valid for result in results)
+
+
+@pytest.mark.django_db
+def test_verify_many_spawned_processes(user_a):
+    # spawned workers start from scratch, without the Django settings of this process
+    encodings = [AccessToken(from_user=user_a).encoding for _ in range(4)]
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = verify_many(encodings, executor=executor)
+
+    assert all(result.valid for result in results)
+
+
+@pytest.mark.django_db
+def test_verify_many_sessions_like_middleware(user_a):
+    pending = RefreshToken(from_user=user_a)
+    session_writer.hold(ActiveToken(token_string=pending.token_string, owner=user_a, exp=pending.exp))
+
+    rotated = RefreshToken(from_user=user_a)
+    rotated.save()
+
+    with override_settings(JWTAUTH={"ROTATE_REFRESH_TOKENS": True, "REFRESH_REUSE_INTERVAL": timedelta(0)}):
+        latest = rotated.rotate().rotate()
+        results = verify_many([pending.encoding, rotated.encoding, latest.encoding], token_class=RefreshToken)
+
+    session_writer.discard(pending.token_string)
+
+    # still waiting in the write-behind queue, reused generation, latest generation
+    assert [result.status for result in results] == [VALID, REVOKED, VALID]
@@ -1,4 +1,6 @@
-from django.urls import path
+from django.urls import include, path
+
+from jwtauth.views import IntrospectionView
 
 from . import views
 
@@ -7,5 +9,9 @@ urlpatterns = [
     path("logged/", views.logged_view, name="logged1"),
     path("logged_/", views.LoggedView.as_view(), name="logged2"),
     path("username/", views.username_view, name="username"),
+    path("plain_username/", views.plain_username_view, name="plain_username"),
+    path("async_username/", views.async_username_view, name="async_username"),
     path("logout", views.logout_view, name="logout"),
+    path("auth/", include("jwtauth.urls")),
+    path("introspect/", IntrospectionView.as_view(), name="introspect"),
 ]
@@ -1,4 +1,5 @@
 from django.contrib.auth import authenticate
+from django.http import HttpResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.parsers import JSONParser
@@ -51,3 +52,13 @@ def username_view(request):
 def logout_view(request):
     logout(request)
     return Response(status=204)
+
+
+def plain_username_view(request):
+    """A Django view, relying on request.user rather than on REST framework."""
+    return HttpResponse(request.user.username)
+
+
+async def async_username_view(request):
+    user = await request.auser()
+    return HttpResponse(user.username)
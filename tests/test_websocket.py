@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from jwtauth.models import ActiveToken
+from jwtauth.settings import api_settings
+from jwtauth.tokens import AccessToken, RefreshToken
+from jwtauth.websocket import SESSION_ENDED_CLOSE_CODE, WebSocketAuthMiddleware
+
+
+async def echo_username(scope, receive, send):
+    """A minimal websocket application sending back the username on every message."""
+    while True:
+        message = await receive()
+
+        if message["type"] == "websocket.connect":
+            await send({"type": "websocket.accept"})
+
+        elif message["type"] == "websocket.receive":
+            await send({"type": "websocket.send", "text": scope["user"].username})
+
+        else:
+            return
+
+
+def scope_for(tokens):
+    cookie = "; ".join(
+        f"{name}={token.encoding}"
+        for name, token in zip(
+            [api_settings.ACCESS_TOKEN_COOKIE_NAME, api_settings.REFRESH_TOKEN_COOKIE_NAME], tokens, strict=True
+        )
+    )
+    return {"type": "websocket", "path": "/ws/", "headers": [(b"cookie", cookie.encode())]}
+
+
+@pytest.fixture
+def tokens(user_a):
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    return AccessToken(from_user=user_a), refresh
+
+
+@async_to_sync
+async def exchange(scope, *actions):
+    """Connect, then send each text message (or await each coroutine function), returning the replies."""
+    communicator = ApplicationCommunicator(WebSocketAuthMiddleware(echo_username), scope)
+    await communicator.send_input({"type": "websocket.connect"})
+    assert (await communicator.receive_output())["type"] == "websocket.accept"
+
+    replies = []
+
+    for action in actions:
+        if callable(action):
+            await action()
+            continue
+
+        await communicator.send_input({"type": "websocket.receive", "text": action})
+        replies.append(await communicator.receive_output())
+
+    await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+    await communicator.wait()
+    return replies
+
+
+@pytest.mark.django_db
+def test_websocket_authenticated(tokens, user_a, django_assert_num_queries):
+    # a single query for the handshake, none for the messages (well within the recheck interval)
+    with django_assert_num_queries(1):
+        replies = exchange(scope_for(tokens), "a", "b", "c")
+
+    assert [reply["text"] for reply in replies] == [user_a.username] * 3
+
+
+@pytest.mark.django_db
+def test_websocket_anonymous():
+    replies = exchange({"type": "websocket", "path": "/ws/", "headers": []}, "a")
+    assert replies[0]["text"] == ""
+
+
+async def wait_for_disconnect(scope, receive, send):
+    """A websocket application only pushing data: it never receives messages from the client."""
+    assert (await receive())["type"] == "websocket.connect"
+    await send({"type": "websocket.accept"})
+
+    while (await receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@async_to_sync
+async def idle_connection(scope, action):
+    communicator = ApplicationCommunicator(WebSocketAuthMiddleware(wait_for_disconnect), scope)
+    await communicator.send_input({"type": "websocket.connect"})
+    assert (await communicator.receive_output())["type"] == "websocket.accept"
+
+    await sync_to_async(action)()
+
+    # closed by the recheck timer, although the client does not send anything
+    closed = await communicator.receive_output(timeout=5)
+    await communicator.wait()
+    return closed
+
+
+@pytest.mark.django_db
+def test_websocket_revoked(tokens):
+    access, refresh = tokens
+
+    with override_settings(JWTAUTH={"WEBSOCKET_RECHECK_INTERVAL": timedelta(milliseconds=50)}):
+        closed = idle_connection(scope_for(tokens), refresh.blacklist)
+
+    assert closed == {"type": "websocket.close", "code": SESSION_ENDED_CLOSE_CODE}
+
+
+@pytest.mark.django_db
+def test_websocket_bearer(user_a):
+    access = AccessToken(from_user=user_a, duration=timedelta(seconds=1))
+    scope = {"type": "websocket", "path": "/ws/", "headers": [(b"authorization", f"Bearer {access.encoding}".encode())]}
+
+    # no refresh token to check: the connection lasts as long as the access token
+    with override_settings(JWTAUTH={"WEBSOCKET_RECHECK_INTERVAL": timedelta(milliseconds=50)}):
+        closed = idle_connection(scope, lambda: None)
+
+    assert closed == {"type": "websocket.close", "code": SESSION_ENDED_CLOSE_CODE}
+
+
+@pytest.mark.django_db
+def test_websocket_no_rotation(client, user_a):
+    refresh = RefreshToken(from_user=user_a)
+    refresh.save()
+    expired = AccessToken(from_user=user_a, duration=timedelta(0))
+
+    with override_settings(JWTAUTH={"ROTATE_REFRESH_TOKENS": True, "REFRESH_REUSE_INTERVAL": timedelta(seconds=-1)}):
+        replies = exchange(scope_for((expired, refresh)), "a")
+        assert replies[0]["text"] == user_a.username
+
+        # the handshake cannot deliver a rotated token: the cookies of the browser remain valid
+        assert ActiveToken.objects.get().generation == 0
+
+        client.cookies[api_settings.ACCESS_TOKEN_COOKIE_NAME] = expired.encoding
+        client.cookies[api_settings.REFRESH_TOKEN_COOKIE_NAME] = refresh.encoding
+        assert client.get(reverse("logged1")).status_code == status.HTTP_204_NO_CONTENT
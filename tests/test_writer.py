@@ -0,0 +1,184 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import override_settings
+
+from jwtauth.models import ActiveToken
+from jwtauth.revocation import revoke_user_sessions
+from jwtauth.settings import api_settings
+from jwtauth.tokens import RefreshToken
+from jwtauth.writer import session_writer
+
+# deferred writes without the background thread: flushed inline once 3 operations are pending
+WRITE_BEHIND = {"WRITE_BEHIND": True, "WRITE_BEHIND_BATCH_SIZE": 3, "WRITE_BEHIND_FLUSH_INTERVAL": None}
+
+
+@pytest.fixture
+def write_behind():
+    with override_settings(JWTAUTH=WRITE_BEHIND):
+        yield session_writer
+        session_writer.flush()
+
+
+@pytest.mark.django_db
+def test_synchronous_insert(user_a):
+    # by default the session is written immediately
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    assert not session_writer.pending(token.token_string)
+    assert ActiveToken.objects.filter(token_string=token.token_string).exists()
+
+
+@pytest.mark.django_db
+def test_deferred_insert(user_a, write_behind):
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    assert write_behind.pending(token.token_string)
+    assert ActiveToken.objects.count() == 0
+
+    write_behind.flush()
+
+    assert not write_behind.pending(token.token_string)
+    assert ActiveToken.objects.get(token_string=token.token_string).owner == user_a
+
+
+@pytest.mark.django_db
+def test_deferred_batch_size(user_a, write_behind):
+    tokens = [RefreshToken(from_user=user_a) for _ in range(api_settings.WRITE_BEHIND_BATCH_SIZE)]
+
+    for token in tokens[:-1]:
+        token.save()
+
+    assert ActiveToken.objects.count() == 0
+
+    # the last insert fills the batch and triggers a flush
+    tokens[-1].save()
+    assert ActiveToken.objects.count() == len(tokens)
+
+
+@pytest.mark.django_db
+def test_deferred_touch_coalesced(user_a, write_behind):
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    write_behind.flush()
+
+    write_behind.touch(token.token_string, token.iat + 10)
+    write_behind.touch(token.token_string, token.iat + 20)
+    assert write_behind.size() == 1
+
+    write_behind.flush()
+    assert ActiveToken.objects.get(token_string=token.token_string).last_seen == token.iat + 20
+
+
+@pytest.mark.django_db
+def test_deferred_blacklist_discards_insert(user_a, write_behind):
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    token.blacklist()
+    assert not write_behind.pending(token.token_string)
+
+    write_behind.flush()
+    assert ActiveToken.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_deferred_insert_active(user_a, write_behind):
+    # a session waiting in the queue is considered active
+    token = RefreshToken(from_user=user_a)
+    token.save()
+    assert RefreshToken(from_encoding=token.encoding).valid()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("deferred", [False, True])
+def test_max_sessions_per_user(user_a, deferred):
+    tokens = [RefreshToken(from_user=user_a, duration=timedelta(days=1, seconds=i)) for i in range(4)]
+
+    with override_settings(JWTAUTH={**(WRITE_BEHIND if deferred else {}), "MAX_SESSIONS_PER_USER": 2}):
+        for token in tokens:
+            token.save()
+
+        session_writer.flush()
+
+    # the two oldest sessions have been revoked
+    assert set(ActiveToken.objects.values_list("token_string", flat=True)) == {t.token_string for t in tokens[2:]}
+    assert [RefreshToken(from_encoding=t.encoding).blacklisted() for t in tokens] == [True, True, False, False]
+
+
+@pytest.mark.django_db
+def test_deferred_bad_row(user_a, write_behind):
+    stored = RefreshToken(from_user=user_a)
+    stored.save()
+    write_behind.flush()
+
+    # a duplicate session does not hold back the valid ones
+    tokens = [RefreshToken(from_user=user_a) for _ in range(2)]
+    write_behind.insert(ActiveToken(token_string=stored.token_string, owner=user_a, exp=stored.exp))
+
+    for token in tokens:
+        token.save()
+
+    assert write_behind.size() == 0
+    assert ActiveToken.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_deferred_queue_size(user_a):
+    def database_down(execute, sql, params, many, context):
+        raise OperationalError("connection refused")
+
+    settings = {**WRITE_BEHIND, "WRITE_BEHIND_BATCH_SIZE": 100, "WRITE_BEHIND_MAX_QUEUE_SIZE": 2}
+
+    with override_settings(JWTAUTH=settings):
+        sessions = [ActiveToken(token_string=f"token{i}", owner=user_a, exp=0) for i in range(4)]
+
+        with connection.execute_wrapper(database_down):
+            for session in sessions:
+                session_writer.insert(session)
+
+            # the sessions that could not be written are kept, up to the limit
+            assert session_writer.size() == 2
+
+        session_writer.flush()
+
+    assert ActiveToken.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_max_sessions_set_based(user_a, django_assert_max_num_queries):
+    users = [user_a] + [User.objects.create_user(f"user{i}") for i in range(5)]
+
+    with override_settings(JWTAUTH={"MAX_SESSIONS_PER_USER": 1}):
+        for user in users:
+            for i in range(2):
+                session_writer.insert(ActiveToken(token_string=f"{user.pk}-{i}", owner=user, exp=10**10 + i))
+
+    with override_settings(JWTAUTH={**WRITE_BEHIND, "WRITE_BEHIND_BATCH_SIZE": 100, "MAX_SESSIONS_PER_USER": 1}):
+        for user in users:
+            session_writer.insert(ActiveToken(token_string=f"{user.pk}-new", owner=user, exp=10**10 + 10))
+
+        # the number of queries does not depend on the number of users
+        with django_assert_max_num_queries(10):
+            session_writer.flush()
+
+    assert sorted(ActiveToken.objects.values_list("token_string", flat=True)) == sorted(
+        f"{user.pk}-new" for user in users
+    )
+
+
+@pytest.mark.django_db
+def test_revoke_queued_sessions(user_a, write_behind):
+    stored = RefreshToken(from_user=user_a)
+    stored.save()
+    write_behind.flush()
+
+    queued = RefreshToken(from_user=user_a)
+    queued.save()
+    assert revoke_user_sessions(user_a) == 2
+
+    # the queued session is neither written nor accepted
+    write_behind.flush()
+    assert ActiveToken.objects.count() == 0
+    assert not RefreshToken(from_encoding=queued.encoding).valid()